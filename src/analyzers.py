@@ -0,0 +1,130 @@
+import time
+from collections import deque
+
+import mediapipe as mp
+
+from cpr_analyzer import CPRAnalyzer
+from pose_backend import MediaPipeBackend
+from pose_detector import PoseDetector, draw_skeleton, landmarks_from_array
+
+
+class Analyzer:
+    """Base class for exercise analyzers fed from a shared pose inference.
+
+    Subclasses set a unique name and implement process(), which receives
+    the (33, 4) landmark array (or None when no pose was found) and
+    returns a metrics dict. Analyzers only do their own metric math; they
+    never run the pose model themselves.
+    """
+    name = None
+
+    def process(self, landmarks, frame_shape, timestamp, frame=None):
+        raise NotImplementedError
+
+    def reset(self):
+        pass
+
+
+class SquatAnalyzer(Analyzer):
+    name = 'squat'
+
+    def __init__(self, pose_detector=None):
+        self.pose_detector = pose_detector or PoseDetector()
+
+    def process(self, landmarks, frame_shape, timestamp, frame=None):
+        capped = self.pose_detector.reached_max_reps()
+        metrics = self.pose_detector.process_landmarks(
+            landmarks, frame_shape[0], timestamp, frame)
+        if frame is not None and landmarks is not None and not capped:
+            self.pose_detector.draw_guides(frame, landmarks_from_array(landmarks))
+        return metrics
+
+    def reset(self):
+        self.pose_detector.reset_tracking()
+
+
+class CPRPoseAnalyzer(Analyzer):
+    """Drives CPRAnalyzer from wrist motion in the shared landmarks.
+
+    Compression depth is the drop of the wrist midpoint below the highest
+    point seen over the last window of frames, in the same approximate
+    units (normalized * 100) the squat metrics use.
+    """
+    name = 'cpr'
+
+    def __init__(self, window=30):
+        self.cpr_analyzer = CPRAnalyzer()
+        self.wrist_heights = deque(maxlen=window)
+
+    def process(self, landmarks, frame_shape, timestamp, frame=None):
+        metrics = {'rate': 0, 'depth': 0, 'depth_score': 0,
+                   'compression_count': self.cpr_analyzer.compression_count}
+        if landmarks is None:
+            return metrics
+
+        pose_landmark = mp.solutions.pose.PoseLandmark
+        wrist_y = (landmarks[pose_landmark.LEFT_WRIST][1] +
+                   landmarks[pose_landmark.RIGHT_WRIST][1]) / 2
+        self.wrist_heights.append(wrist_y)
+        depth = float(wrist_y - min(self.wrist_heights)) * 100
+
+        rate, depth_score = self.cpr_analyzer.analyze_compression(depth, timestamp)
+        metrics.update({
+            'rate': float(rate),
+            'depth': depth,
+            'depth_score': depth_score,
+            'compression_count': self.cpr_analyzer.compression_count
+        })
+        return metrics
+
+    def reset(self):
+        self.cpr_analyzer = CPRAnalyzer()
+        self.wrist_heights.clear()
+
+
+class AnalysisPipeline:
+    """Runs pose inference once per frame and fans it out to analyzers.
+
+    Register any number of analyzers; each frame costs one model run plus
+    every analyzer's own metric math. process() returns a dict with the
+    shared 'landmarks' and 'frame' and one metrics dict per analyzer name.
+    """
+
+    def __init__(self, analyzers=None, backend=None):
+        self.backend = backend if backend is not None else MediaPipeBackend()
+        self.analyzers = {}
+        for analyzer in analyzers or []:
+            self.register(analyzer)
+
+    def register(self, analyzer):
+        if analyzer.name in self.analyzers:
+            raise ValueError(f"Analyzer '{analyzer.name}' is already registered")
+        self.analyzers[analyzer.name] = analyzer
+        return analyzer
+
+    def unregister(self, name):
+        return self.analyzers.pop(name, None)
+
+    def reset(self):
+        for analyzer in self.analyzers.values():
+            analyzer.reset()
+
+    def process(self, frame, timestamp=None, draw=True):
+        if timestamp is None:
+            timestamp = time.time()
+        landmarks = self.backend.process(frame)
+
+        output = self.process_landmarks(landmarks, frame.shape, timestamp,
+                                        frame if draw else None)
+        if draw and landmarks is not None:
+            # Draw skeleton once for all analyzers
+            draw_skeleton(frame, landmarks_from_array(landmarks))
+        output['frame'] = frame
+        return output
+
+    def process_landmarks(self, landmarks, frame_shape, timestamp, frame=None):
+        """Feed already-computed landmarks (remote, recorded) to every analyzer."""
+        output = {'landmarks': landmarks, 'timestamp': timestamp, 'frame': frame}
+        for name, analyzer in self.analyzers.items():
+            output[name] = analyzer.process(landmarks, frame_shape, timestamp, frame)
+        return output
@@ -0,0 +1,284 @@
+import glob
+import inspect
+import os
+import time
+import urllib.parse
+from collections import deque
+
+import cv2
+import numpy as np
+
+STREAM_SCHEMES = ('rtsp://', 'rtsps://', 'rtmp://', 'http://', 'https://', 'udp://', 'tcp://')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+# http(s) URLs ending in these are video files to read in full, not live streams
+VIDEO_EXTENSIONS = ('.mp4', '.m4v', '.mov', '.avi', '.mkv', '.webm')
+
+# Ask FFmpeg not to buffer network streams; only applies if the user has not
+# configured capture options themselves, and must be set before opening
+LOW_LATENCY_FFMPEG_OPTIONS = 'rtsp_transport;tcp|fflags;nobuffer|flags;low_delay'
+
+
+class CaptureSource:
+    """A frame source with the cv2.VideoCapture interface plus latency probes.
+
+    The probe measures frame age: how long ago a frame was captured when
+    read() hands it over, which is the delay buffering adds. Frame times
+    come from the backend's CAP_PROP_POS_MSEC, read on one of three clocks:
+
+    'monotonic'  driver timestamps on time.monotonic()'s clock (V4L2), so
+                 the age is absolute
+    'relative'   stream timestamps with an unknown origin; the age is
+                 measured against the freshest frame seen so far
+    'playback'   file timestamps; the age is how far behind real-time
+                 playback from the first read (or last seek) a frame is
+
+    How long read() blocks is kept separately, since a buffered source
+    answers instantly with an old frame.
+    """
+
+    def __init__(self, cap, description, grab_latest=False, max_discard=5, clock='relative'):
+        self.cap = cap
+        self.description = description
+        self.grab_latest = grab_latest
+        self.max_discard = max_discard
+        self.clock = clock
+        self.clock_offset = None
+        self.ages = deque(maxlen=300)
+        self.waits = deque(maxlen=300)
+        self.discarded = 0
+        self.last_grab = None
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def _grab_newest(self):
+        """Grab, skipping frames that a newer buffered frame has superseded.
+
+        A grab that has to wait for the camera is the newest frame. One
+        that returns at once may be fresh too, so it is only skipped if it
+        is known to be stale: on the 'monotonic' clock when its driver
+        timestamp is over a frame interval old, otherwise when more frames
+        than this one can have arrived since the last read.
+        """
+        interval = 1.0 / (self.get(cv2.CAP_PROP_FPS) or 30)
+        now = time.monotonic()
+        if self.last_grab is None:
+            arrived = 1
+        else:
+            arrived = int((now - self.last_grab) / interval)
+        for grabs in range(1, self.max_discard + 2):
+            start = time.perf_counter()
+            if not self.cap.grab():
+                return False
+            if time.perf_counter() - start >= 0.5 * interval or grabs > self.max_discard:
+                break
+            if self.clock == 'monotonic':
+                frame_time = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                if frame_time <= 0 or time.monotonic() - frame_time <= interval:
+                    break
+            elif grabs >= arrived:
+                break
+            self.discarded += 1
+        self.last_grab = time.monotonic()
+        return True
+
+    def grab(self):
+        return self.cap.grab()
+
+    def retrieve(self, image=None):
+        return self.cap.retrieve(image)
+
+    def read(self, image=None):
+        start = time.perf_counter()
+        if self.grab_latest:
+            if not self._grab_newest():
+                return False, None
+            ret, frame = self.cap.retrieve(image)
+        else:
+            ret, frame = self.cap.read(image)
+        if ret:
+            self.waits.append(time.perf_counter() - start)
+            age = self._frame_age(time.monotonic())
+            if age is not None:
+                self.ages.append(age)
+        return ret, frame
+
+    def _frame_age(self, now):
+        frame_time = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if self.clock == 'monotonic':
+            if frame_time <= 0:
+                return None  # V4L2 reports 0 for the first frame
+            age = now - frame_time
+            if 0 <= age < 10:
+                return age
+            # Not on the monotonic clock after all (e.g. another driver)
+            self.clock = 'relative'
+        offset = now - frame_time
+        if self.clock_offset is None or (self.clock == 'relative' and offset < self.clock_offset):
+            self.clock_offset = offset
+        # A file read faster than real time is early, not late
+        return max(0.0, offset - self.clock_offset)
+
+    def reset_clock(self):
+        """Forget the 'relative'/'playback' time origin, e.g. after a pause."""
+        self.clock_offset = None
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def set(self, prop, value):
+        if prop in (cv2.CAP_PROP_POS_FRAMES, cv2.CAP_PROP_POS_MSEC):
+            self.reset_clock()
+        return self.cap.set(prop, value)
+
+    def release(self):
+        self.cap.release()
+
+    def latency_stats(self):
+        """Frame age and read wait in milliseconds over the recent reads."""
+        if not self.waits:
+            return None
+        waits = np.array(self.waits) * 1000
+        stats = {
+            'source': self.description,
+            'clock': self.clock,
+            'reads': len(waits),
+            'wait_mean_ms': float(waits.mean()),
+            'wait_p95_ms': float(np.percentile(waits, 95)),
+            'discarded': self.discarded,
+            'mean_ms': None,
+            'p95_ms': None,
+            'max_ms': None
+        }
+        if self.ages:
+            ages = np.array(self.ages) * 1000
+            stats.update(mean_ms=float(ages.mean()), p95_ms=float(np.percentile(ages, 95)),
+                         max_ms=float(ages.max()))
+        return stats
+
+
+class WebcamSource(CaptureSource):
+    def __init__(self, index=0, width=1280, height=720, fps=None,
+                 mjpg=True, buffer_size=1, grab_latest=True):
+        cap = cv2.VideoCapture(index)
+        if mjpg:
+            # Compressed transfer lets USB cameras deliver full resolution at full rate
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps:
+            cap.set(cv2.CAP_PROP_FPS, fps)
+        if buffer_size:
+            # Not every backend honors this; grab_latest covers the rest
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+        # V4L2 reports driver capture timestamps; others only relative ones
+        clock = 'monotonic' if cap.isOpened() and cap.getBackendName() == 'V4L2' else 'relative'
+        super().__init__(cap, f"webcam {index}", grab_latest=grab_latest, clock=clock)
+
+
+class FileSource(CaptureSource):
+    """Every frame of a video file (local or http(s)), in order."""
+
+    def __init__(self, path):
+        super().__init__(cv2.VideoCapture(path), f"file {path}", clock='playback')
+
+
+class StreamSource(CaptureSource):
+    def __init__(self, url, buffer_size=1, grab_latest=True):
+        os.environ.setdefault('OPENCV_FFMPEG_CAPTURE_OPTIONS', LOW_LATENCY_FFMPEG_OPTIONS)
+        cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG)
+        if buffer_size:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+        super().__init__(cap, f"stream {url}", grab_latest=grab_latest)
+
+
+class ImageSequenceCapture:
+    """VideoCapture-like reader over a directory of images in name order."""
+
+    def __init__(self, directory, fps=30.0):
+        self.paths = sorted(
+            path for path in glob.glob(os.path.join(directory, '*'))
+            if path.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.fps = fps
+        self.position = 0
+        self.pending = None
+
+    def isOpened(self):
+        return bool(self.paths)
+
+    def grab(self):
+        if self.position >= len(self.paths):
+            return False
+        self.pending = self.paths[self.position]
+        self.position += 1
+        return True
+
+    def retrieve(self, image=None):
+        if self.pending is None:
+            return False, None
+        frame = cv2.imread(self.pending, cv2.IMREAD_COLOR)
+        if frame is None:
+            return False, None
+        if image is not None and image.shape == frame.shape:
+            image[...] = frame
+            frame = image
+        return True, frame
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self.paths)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self.position
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            # Time of the frame last grabbed, like VideoCapture
+            return max(0, self.position - 1) * 1000.0 / self.fps
+        return 0
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.position = max(0, min(len(self.paths), int(value)))
+            return True
+        return False
+
+    def release(self):
+        self.paths = []
+
+
+class ImageSequenceSource(CaptureSource):
+    def __init__(self, directory, fps=30.0):
+        super().__init__(ImageSequenceCapture(directory, fps), f"images {directory}",
+                         clock='playback')
+
+
+def is_video_file_url(spec):
+    parsed = urllib.parse.urlparse(spec)
+    return parsed.scheme in ('http', 'https') and parsed.path.lower().endswith(VIDEO_EXTENSIONS)
+
+
+def open_capture(spec, **options):
+    """Open a source from a webcam index, stream URL, image directory or file path.
+
+    Keyword options are passed to the matching source class; options it
+    does not take (e.g. width for a file) are ignored, so one set of
+    options can be used whatever the spec turns out to be. http(s) URLs of
+    video files are read as files, frame by frame.
+    """
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        source_class, spec = WebcamSource, int(spec)
+    elif spec.lower().startswith(STREAM_SCHEMES) and not is_video_file_url(spec):
+        source_class = StreamSource
+    elif os.path.isdir(spec):
+        source_class = ImageSequenceSource
+    else:
+        source_class = FileSource
+    accepted = inspect.signature(source_class.__init__).parameters
+    return source_class(spec, **{name: value for name, value in options.items()
+                                 if name in accepted})
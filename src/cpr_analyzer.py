@@ -12,11 +12,12 @@ class CPRAnalyzer:
         self.last_depth = 0
         self.peak_threshold = 10  # More sensitive threshold
         
-    def analyze_compression(self, depth):
+    def analyze_compression(self, depth, timestamp=None):
+        """timestamp is when the depth was measured; defaults to now for live use."""
         if depth is None:
             return 0, 0
             
-        current_time = time.time()
+        current_time = time.time() if timestamp is None else timestamp
         
         # Detect peaks in motion
         if not self.is_compression and depth > self.peak_threshold:
@@ -46,9 +47,6 @@ class CPRAnalyzer:
         # Calculate depth score
         depth_score = self.calculate_depth_score(abs(depth))
         
-        # Debug output
-        print(f"Depth: {depth:.1f}, Rate: {self.current_rate:.1f}, Count: {self.compression_count}")
-        
         return self.current_rate, depth_score
     
     def calculate_depth_score(self, depth):
@@ -0,0 +1,34 @@
+import cv2
+import numpy as np
+
+class FramePool:
+    """Reusable per-stage frame buffers.
+
+    Each processing stage asks for its destination array by name; the
+    array is allocated once and reused as long as the shape and dtype
+    stay the same, so the per-frame OpenCV calls write into existing
+    memory instead of allocating new frames.
+    """
+
+    def __init__(self):
+        self.buffers = {}
+
+    def get(self, name, shape, dtype=np.uint8):
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self.buffers[name] = buffer
+        return buffer
+
+    def flip(self, name, frame, flip_code=1):
+        return cv2.flip(frame, flip_code, dst=self.get(name, frame.shape, frame.dtype))
+
+    def cvt_color(self, name, frame, code):
+        # All conversions used here keep the channel count
+        return cv2.cvtColor(frame, code, dst=self.get(name, frame.shape, frame.dtype))
+
+    def resize(self, name, frame, size, interpolation=cv2.INTER_LINEAR):
+        width, height = size
+        shape = (height, width) + frame.shape[2:]
+        return cv2.resize(frame, size, dst=self.get(name, shape, frame.dtype),
+                          interpolation=interpolation)
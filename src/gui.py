@@ -1,6 +1,8 @@
 import pygame
 import cv2
 import numpy as np
+from frame_pool import FramePool
+from session_timeline import START, END, MIN_ANGLE, MAX_ANGLE, MIN_DEPTH, MAX_DEPTH, REP_COMPLETED
 
 class Button:
     def __init__(self, x, y, width, height, text, color, hover_color):
@@ -67,8 +69,16 @@ class GUI:
         self.recording = False
         self.show_summary = False
         self.summary_data = None
+        self.summary_thumbnails = {}
+        # Optional SessionTimeline drawn under the video and on the summary
+        self.timeline = None
         self.scroll_y = 0
         
+        # Reused display buffers (see frame_to_surface)
+        self.frame_pool = FramePool()
+        self.frame_surface = None
+        self.frame_surface_buffer = None
+        
         # Button setup
         button_width = 220
         button_height = 60
@@ -223,11 +233,19 @@ class GUI:
             self.screen.blit(rendered_text, text_rect)
             y_pos += 50
 
-    def show_session_summary(self, squat_history):
+    def show_session_summary(self, squat_history, thumbnails=None):
         if not squat_history:
             return
             
         self.show_summary = True
+        # Decode the lowest-point thumbnails once, not on every redraw
+        self.summary_thumbnails = {}
+        if thumbnails is not None:
+            thumbnails.flush()
+            for i in range(min(len(squat_history), 10)):
+                image = thumbnails.get(i)
+                if image is not None:
+                    self.summary_thumbnails[i] = self.thumbnail_to_surface(image)
         self.summary_data = {
             'total_reps': len(squat_history),
             'avg_depth': sum(rep['max_depth'] for rep in squat_history) / len(squat_history),
@@ -284,6 +302,10 @@ class GUI:
             stat = self.font_small.render(text, True, color)
             self.screen.blit(stat, (col2_x, y_pos + i * 30))
         
+        # Knee angle and depth over the whole session
+        if self.timeline is not None:
+            self.draw_timeline(pygame.Rect(stats_box.right - 420, 130, 400, 140))
+        
         y_pos += 100
         
         # Individual Reps Section
@@ -298,8 +320,15 @@ class GUI:
             (header_x + 100, "Depth"),
             (header_x + 220, "Knee Angle"),
             (header_x + 380, "Foot Width"),
-            (header_x + 520, "Quality")
+            (header_x + 520, "Quality"),
+            (header_x + 680, "Bottom")
         ]
+        # Template scores only exist when reps were compared against a coach rep
+        show_coach = any('template_similarity' in rep for rep in self.summary_data['reps'])
+        if show_coach:
+            header_positions.insert(5, (header_x + 680, "Vs Coach"))
+            header_positions[-1] = (header_x + 860, "Bottom")
+        thumbnail_x = header_x + (860 if show_coach else 680)
         
         # Draw headers
         for x_pos, header in header_positions:
@@ -335,6 +364,21 @@ class GUI:
                           self.BLUE if quality == "Okay" else self.RED
             quality_text = self.font_small.render(quality, True, quality_color)
             self.screen.blit(quality_text, (header_x + 520, row_y))
+            
+            # Similarity to the closest coach rep and tempo relative to it
+            if show_coach and 'template_similarity' in rep:
+                coach = f"{rep['template_similarity']:.0f}%"
+                if rep.get('tempo_ratio'):
+                    coach += f" {rep['tempo_ratio']:.1f}x"
+                coach_color = self.GREEN if rep['template_similarity'] >= 70 else \
+                    self.BLUE if rep['template_similarity'] >= 40 else self.RED
+                coach_text = self.font_small.render(coach, True, coach_color)
+                self.screen.blit(coach_text, (header_x + 680, row_y))
+            
+            # Frame at the rep's lowest point
+            thumbnail = self.summary_thumbnails.get(i)
+            if thumbnail is not None:
+                self.screen.blit(thumbnail, (thumbnail_x, row_y))
         
         # Draw continue button
         self.continue_button = Button(
@@ -347,6 +391,42 @@ class GUI:
         )
         self.continue_button.draw(self.screen, self.font_medium)
 
+    def draw_timeline(self, rect):
+        """Knee angle (blue) and depth (green) min/max envelopes with rep boundaries.
+
+        Rep starts are gray lines, completed reps black. Draws at most about
+        one bucket per pixel column, so the cost does not grow with the
+        session length.
+        """
+        pygame.draw.rect(self.screen, self.WHITE, rect)
+        pygame.draw.rect(self.screen, self.GRAY, rect, 1)
+        rows, marks = self.timeline.buckets(rect.width)
+        if len(rows) < 2:
+            return
+        
+        start = rows[0, START]
+        span = max(rows[-1, END] - start, 1e-6)
+        x = rect.left + ((rows[:, START] + rows[:, END]) / 2 - start) / span * (rect.width - 1)
+        
+        # Rep boundaries behind the curves, at most one every few pixels
+        last_marker = -np.inf
+        for column, mark in zip(x[marks != 0].tolist(), marks[marks != 0].tolist()):
+            if column - last_marker < 3:
+                continue
+            color = self.BLACK if mark & REP_COMPLETED else self.GRAY
+            pygame.draw.line(self.screen, color, (column, rect.top), (column, rect.bottom - 1))
+            last_marker = column
+        
+        # Depth is flipped so both curves dip as the athlete goes down
+        for low, high, full_scale, flipped, color in ((MIN_ANGLE, MAX_ANGLE, 180.0, False, self.BLUE),
+                                                      (MIN_DEPTH, MAX_DEPTH, 100.0, True, self.GREEN)):
+            for column in (low, high):
+                fraction = np.clip(rows[:, column] / full_scale, 0.0, 1.0)
+                if flipped:
+                    fraction = 1.0 - fraction
+                y = rect.bottom - 1 - fraction * (rect.height - 1)
+                pygame.draw.lines(self.screen, color, False, np.column_stack([x, y]).tolist())
+
     def assess_squat_quality(self, rep):
         """Assess the quality of a single squat rep based only on depth."""
         depth = rep['max_depth']
@@ -387,6 +467,28 @@ class GUI:
         from collections import Counter
         return Counter(all_issues).most_common(1)[0][0]
 
+    def thumbnail_to_surface(self, image, height=27):
+        """Mirrored surface for a BGR rep thumbnail, scaled to fit a table row."""
+        width = max(1, int(image.shape[1] * height / image.shape[0]))
+        small = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+        mirrored = np.ascontiguousarray(small[:, ::-1])
+        # convert() copies the pixels, so the surface does not keep the array alive
+        return pygame.image.frombuffer(mirrored.tobytes(), (width, height), 'BGR').convert()
+
+    def frame_to_surface(self, frame, size=(800, 600)):
+        """Show a BGR frame through a persistent surface backed by a pooled buffer.
+
+        The surface wraps the buffer directly in pygame's BGR format, so no
+        color conversion, rotation or new surface is needed per frame. The
+        horizontal flip preserves the mirrored orientation of the display.
+        """
+        resized = self.frame_pool.resize('display', frame, size)
+        mirrored = self.frame_pool.flip('display_mirrored', resized)
+        if self.frame_surface_buffer is not mirrored:
+            self.frame_surface = pygame.image.frombuffer(mirrored, size, 'BGR')
+            self.frame_surface_buffer = mirrored
+        return self.frame_surface
+
     def update_display(self, frame, metrics):
         try:
             if self.show_summary:
@@ -394,9 +496,7 @@ class GUI:
             else:
                 self.screen.fill(self.LIGHT_BLUE)
                 
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                frame_rgb = cv2.resize(frame_rgb, (800, 600))
-                frame_surface = pygame.surfarray.make_surface(np.rot90(frame_rgb))
+                frame_surface = self.frame_to_surface(frame)
                 
                 frame_x = (self.width - frame_surface.get_width()) // 2
                 frame_y = (self.height - frame_surface.get_height()) // 2
@@ -406,6 +506,8 @@ class GUI:
                     self.draw_feedback(metrics)
                     self.start_button.draw(self.screen, self.font_medium)
                     self.stop_button.draw(self.screen, self.font_medium)
+                    if self.timeline is not None:
+                        self.draw_timeline(pygame.Rect(20, self.height - 36, self.width - 40, 32))
                 else:
                     self.draw_instructions()
             
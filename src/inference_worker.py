@@ -0,0 +1,228 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from pose_backend import MediaPipeBackend, allocate_cpus
+
+
+class SharedFrameRing:
+    """A fixed number of frame slots in one shared-memory block.
+
+    The GUI process writes frames straight into a slot and only sends the
+    slot index over a queue, so frames are never pickled.
+    """
+
+    def __init__(self, shape, slots=3, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        size = slots * int(np.prod(self.shape))
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        if not self.owner:
+            # Attaching registers the block for cleanup as if we owned it;
+            # only the creating process may unlink it
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def worker_main(requests, results, model_complexity, input_width, cpus):
+    """Inference process: one pose backend (and tracking state) per stream."""
+    streams = {}
+    running = True
+    while running:
+        messages = [requests.get()]
+        # Drain the backlog; only the newest frame of each stream is worth running
+        while True:
+            try:
+                messages.append(requests.get_nowait())
+            except queue.Empty:
+                break
+
+        newest = {}
+        for message in messages:
+            if message is None:
+                running = False
+                break
+            kind, stream_id = message[0], message[1]
+            if kind == 'open':
+                _, _, name, shape, slots = message
+                backend = MediaPipeBackend(model_complexity, input_width, cpus=cpus)
+                streams[stream_id] = (SharedFrameRing(shape, slots, name), backend)
+            elif kind == 'quality':
+                if stream_id in streams:
+                    _, _, stream_complexity, stream_width = message
+                    backend = streams[stream_id][1]
+                    backend.input_width = stream_width
+                    backend.set_model_complexity(stream_complexity)
+            elif kind == 'close':
+                stream = streams.pop(stream_id, None)
+                newest.pop(stream_id, None)
+                if stream:
+                    stream[0].close()
+                    stream[1].close()
+            elif kind == 'frame':
+                if stream_id in newest:
+                    _, _, slot, sequence, timestamp = newest[stream_id]
+                    results.put((stream_id, sequence, timestamp, None, None, True))
+                newest[stream_id] = message
+
+        for stream_id, (_, _, slot, sequence, timestamp) in newest.items():
+            if stream_id not in streams:
+                continue
+            ring, backend = streams[stream_id]
+            start = time.perf_counter()
+            landmarks = backend.process(ring.frames[slot])
+            results.put((stream_id, sequence, timestamp, landmarks,
+                         time.perf_counter() - start, False))
+
+    for ring, backend in streams.values():
+        ring.close()
+        backend.close()
+
+
+class InferenceClient:
+    """One stream's handle: submit frames, collect landmark results."""
+
+    def __init__(self, server, stream_id, worker, shape, slots):
+        self.server = server
+        self.stream_id = stream_id
+        self.worker = worker
+        self.ring = SharedFrameRing(shape, slots)
+        self.results = queue.Queue()
+        self.sequence = 0
+        self.in_flight = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+        server.requests[worker].put(('open', stream_id, self.ring.name, self.ring.shape, slots))
+
+    def submit(self, frame, timestamp):
+        """Copy a frame into the next slot and queue it. False if dropped.
+
+        A frame is dropped rather than queued when every slot is still
+        waiting on the worker, so the caller never blocks.
+        """
+        if frame.shape != self.ring.shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match stream {self.ring.shape}")
+        with self.lock:
+            if self.in_flight >= self.ring.slots:
+                self.dropped += 1
+                return False
+            self.in_flight += 1
+        slot = self.sequence % self.ring.slots
+        self.ring.frames[slot][...] = frame
+        self.server.requests[self.worker].put(
+            ('frame', self.stream_id, slot, self.sequence, timestamp))
+        self.sequence += 1
+        return True
+
+    def set_quality(self, model_complexity, input_width):
+        """Change this stream's model variant and input width in the worker."""
+        self.server.requests[self.worker].put(
+            ('quality', self.stream_id, model_complexity, input_width))
+
+    def _deliver(self, sequence, timestamp, landmarks, inference_seconds, skipped):
+        with self.lock:
+            self.in_flight -= 1
+        if not skipped:
+            self.results.put((landmarks, timestamp, inference_seconds))
+
+    def poll(self):
+        """All results that arrived since the last poll, oldest first.
+
+        Each is (landmarks or None, capture timestamp, inference seconds).
+        """
+        collected = []
+        while True:
+            try:
+                collected.append(self.results.get_nowait())
+            except queue.Empty:
+                return collected
+
+    def close(self):
+        self.server.requests[self.worker].put(('close', self.stream_id))
+        self.server.clients.pop(self.stream_id, None)
+        self.ring.close()
+
+
+class InferenceServer:
+    """Pose inference in worker processes fed through shared memory.
+
+    Each stream is pinned to one worker so the model's temporal tracking
+    sees its frames in order; several streams spread over the workers.
+    Results come back over a single queue and are routed to the owning
+    InferenceClient by a background thread. num_threads confines each
+    worker's models to that many CPUs of their own (see MediaPipeBackend).
+    """
+
+    def __init__(self, workers=1, model_complexity=1, input_width=None, num_threads=None):
+        self.num_workers = workers
+        self.model_complexity = model_complexity
+        self.input_width = input_width
+        self.num_threads = num_threads
+        self.requests = [multiprocessing.Queue() for _ in range(workers)]
+        self.results = multiprocessing.Queue()
+        self.processes = []
+        self.clients = {}
+        self.stream_ids = itertools.count()
+        self.running = False
+
+    def start(self):
+        self.running = True
+        for requests in self.requests:
+            # Allocated here; each worker process would otherwise start counting from CPU 0
+            cpus = None
+            if self.num_threads and hasattr(os, 'sched_setaffinity'):
+                cpus = allocate_cpus(self.num_threads)
+            process = multiprocessing.Process(
+                target=worker_main,
+                args=(requests, self.results, self.model_complexity, self.input_width, cpus),
+                daemon=True)
+            process.start()
+            self.processes.append(process)
+        self.router = threading.Thread(target=self._route, daemon=True)
+        self.router.start()
+        return self
+
+    def _route(self):
+        while self.running:
+            try:
+                stream_id, *result = self.results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            client = self.clients.get(stream_id)
+            if client:
+                client._deliver(*result)
+
+    def open_stream(self, shape, slots=3):
+        stream_id = next(self.stream_ids)
+        client = InferenceClient(self, stream_id, stream_id % self.num_workers, shape, slots)
+        self.clients[stream_id] = client
+        return client
+
+    def stop(self):
+        for client in list(self.clients.values()):
+            client.close()
+        for requests in self.requests:
+            requests.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        self.running = False
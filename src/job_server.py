@@ -0,0 +1,464 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+from pose_backend import MediaPipeBackend, allocate_cpus
+from pose_detector import PoseDetector
+
+PROGRESS_EVERY = 30  # frames between progress reports
+
+
+class JobStore:
+    """Persistent job queue and result cache backed by SQLite."""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        with self.lock, self.db:
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                )""")
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    content_hash TEXT PRIMARY KEY,
+                    result TEXT NOT NULL
+                )""")
+            # Jobs interrupted by a restart go back to the queue
+            self.db.execute("UPDATE jobs SET status = 'queued', progress = 0 "
+                            "WHERE status = 'running'")
+
+    def submit(self, content_hash):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self.lock, self.db:
+            cached = self.db.execute("SELECT 1 FROM results WHERE content_hash = ?",
+                                     (content_hash,)).fetchone()
+            status, progress = ('done', 1.0) if cached else ('queued', 0.0)
+            self.db.execute("INSERT INTO jobs VALUES (?, ?, ?, ?, NULL, ?, ?)",
+                            (job_id, content_hash, status, progress, now, now))
+        return job_id
+
+    def next_queued(self):
+        """Claim the oldest queued job, or return None."""
+        with self.lock, self.db:
+            # Skip content another worker is already analyzing; finish() answers it
+            row = self.db.execute("SELECT * FROM jobs WHERE status = 'queued' "
+                                  "AND content_hash NOT IN "
+                                  "(SELECT content_hash FROM jobs WHERE status = 'running') "
+                                  "ORDER BY created LIMIT 1").fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE jobs SET status = 'running', updated = ? WHERE id = ?",
+                            (time.time(), row['id']))
+            return dict(row)
+
+    def set_progress(self, job_id, progress):
+        with self.lock, self.db:
+            self.db.execute("UPDATE jobs SET progress = ?, updated = ? WHERE id = ?",
+                            (progress, time.time(), job_id))
+
+    def finish(self, job_id, content_hash, result):
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO results VALUES (?, ?)",
+                            (content_hash, json.dumps(result)))
+            # Any other job waiting on the same content is answered too
+            self.db.execute("UPDATE jobs SET status = 'done', progress = 1, updated = ? "
+                            "WHERE content_hash = ? AND status != 'failed'",
+                            (time.time(), content_hash))
+
+    def requeue(self, job_id):
+        """Put a running job back in the queue, e.g. after its worker died."""
+        with self.lock, self.db:
+            self.db.execute("UPDATE jobs SET status = 'queued', progress = 0, updated = ? "
+                            "WHERE id = ? AND status = 'running'", (time.time(), job_id))
+
+    def fail(self, job_id, error):
+        with self.lock, self.db:
+            self.db.execute("UPDATE jobs SET status = 'failed', error = ?, updated = ? "
+                            "WHERE id = ?", (error, time.time(), job_id))
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            job = dict(row)
+            if job['status'] == 'done':
+                result = self.db.execute("SELECT result FROM results WHERE content_hash = ?",
+                                         (job['content_hash'],)).fetchone()
+                job['result'] = json.loads(result['result']) if result else None
+        return job
+
+    def list(self):
+        with self.lock:
+            rows = self.db.execute("SELECT id, status, progress FROM jobs "
+                                   "ORDER BY created").fetchall()
+        return [dict(row) for row in rows]
+
+
+def analyze_file(pose_detector, video_path, report_progress):
+    """Run a video through the rep logic headlessly and return rep JSON."""
+    pose_detector.reset_tracking()
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("could not open video")
+
+    try:
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+        frame_index = 0
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            pose_detector.detect_pose(frame, timestamp)
+            frame_index += 1
+            if total_frames and frame_index % PROGRESS_EVERY == 0:
+                report_progress(min(0.99, frame_index / total_frames))
+    finally:
+        cap.release()
+
+    return {
+        'squat_count': pose_detector.squat_count,
+        'frames': frame_index,
+        'reps': [
+            {key: float(value) if isinstance(value, (int, float)) else value
+             for key, value in rep.items()}
+            for rep in pose_detector.squat_history
+        ]
+    }
+
+
+def worker_main(tasks, events, cpus=None, backend_factory=None):
+    """Worker process: one PoseDetector reused for every job it runs.
+
+    backend_factory (a picklable callable) replaces the MediaPipe backend,
+    e.g. with a ReplayBackend for load tests. The worker reports 'ready'
+    once set up, so one that fails at startup is never handed a job.
+    """
+    backend = backend_factory() if backend_factory else MediaPipeBackend(cpus=cpus)
+    # Batch jobs count every rep; the 10-rep cap is for the live session
+    pose_detector = PoseDetector(backend=backend, max_reps=None)
+    events.put(('ready', None, os.getpid()))
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job_id, content_hash, video_path = task
+
+        def report_progress(progress):
+            events.put(('progress', job_id, progress))
+
+        try:
+            result = analyze_file(pose_detector, video_path, report_progress)
+            events.put(('done', job_id, (content_hash, result)))
+        except Exception as e:
+            events.put(('failed', job_id, str(e)))
+
+
+class JobServer:
+    """Local HTTP job server running VideoAnalyzer's rep logic in a worker pool.
+
+    POST /jobs with the raw video as the request body to submit a job.
+    GET /jobs lists jobs, GET /jobs/<id> returns status, progress and,
+    once done, the rep JSON. Results are cached by the SHA-256 of the
+    uploaded bytes, so resubmitting a video is answered immediately.
+    threads_per_worker confines each worker's model to that many CPUs.
+    A worker process that dies is restarted; its job is retried up to
+    max_retries times and then marked failed. Restarts back off
+    exponentially from restart_delay seconds while a slot keeps dying
+    without finishing a job, and after max_worker_failures such deaths
+    in a row the slot is given up. With every slot given up the server
+    is unhealthy: uploads get 503 and queued jobs are failed.
+    """
+
+    MAX_RESTART_DELAY = 30.0
+
+    def __init__(self, data_dir, workers=2, host='127.0.0.1', port=8765, threads_per_worker=None,
+                 backend_factory=None, max_retries=1, restart_delay=0.5, max_worker_failures=5):
+        self.data_dir = data_dir
+        self.upload_dir = os.path.join(data_dir, 'uploads')
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self.store = JobStore(os.path.join(data_dir, 'jobs.db'))
+
+        self.events = multiprocessing.Queue()
+        self.num_workers = workers
+        self.threads_per_worker = threads_per_worker
+        self.backend_factory = backend_factory
+        self.max_retries = max_retries
+        self.restart_delay = restart_delay
+        self.max_worker_failures = max_worker_failures
+        # Each worker has its own task queue so a crash can be traced to its job
+        self.workers = []
+        self.task_queues = []
+        self.worker_cpus = []
+        self.assigned = {}  # worker index -> job id
+        self.ready = set()  # worker indexes that finished starting up
+        self.crashes = {}  # job id -> times its worker died
+        self.failures = []  # per worker: deaths in a row without finishing a job
+        self.restart_at = []  # per worker: monotonic time to start its replacement
+        self.given_up = set()
+        self.lock = threading.Lock()
+        self.running = False
+
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+
+    @property
+    def address(self):
+        return self.httpd.server_address
+
+    @property
+    def healthy(self):
+        return len(self.given_up) < self.num_workers
+
+    def store_upload(self, stream, length):
+        """Stream an upload to disk, hashing it on the way. Returns its hash."""
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=self.upload_dir, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                remaining = length
+                while remaining > 0:
+                    chunk = stream.read(min(1 << 20, remaining))
+                    if not chunk:
+                        raise ValueError("upload truncated")
+                    digest.update(chunk)
+                    f.write(chunk)
+                    remaining -= len(chunk)
+            content_hash = digest.hexdigest()
+            os.replace(temp_path, self.upload_path(content_hash))
+        except Exception:
+            os.remove(temp_path)
+            raise
+        return content_hash
+
+    def upload_path(self, content_hash):
+        return os.path.join(self.upload_dir, content_hash + '.mp4')
+
+    def _dispatch(self):
+        # Hand queued jobs to idle workers, one job per worker at a time
+        while self.running:
+            self._check_workers()
+            if not self.healthy:
+                job = self.store.next_queued()
+                if job is None:
+                    time.sleep(0.2)
+                else:
+                    self.store.fail(job['id'], "no workers available")
+                continue
+            with self.lock:
+                idle = [i for i in self.ready if i not in self.assigned]
+            job = self.store.next_queued() if idle else None
+            if job is None:
+                time.sleep(0.2)
+                continue
+            with self.lock:
+                self.assigned[idle[0]] = job['id']
+            self.task_queues[idle[0]].put((job['id'], job['content_hash'],
+                                           self.upload_path(job['content_hash'])))
+
+    def _check_workers(self):
+        now = time.monotonic()
+        for index, worker in enumerate(self.workers):
+            if not self.running:
+                return
+            if worker is None:
+                # Waiting out its restart delay, or given up
+                if index not in self.given_up and now >= self.restart_at[index]:
+                    self._start_worker(index)
+                continue
+            if worker.is_alive():
+                continue
+            with self.lock:
+                job_id = self.assigned.pop(index, None)
+                self.ready.discard(index)
+            self.workers[index] = None
+            if job_id is not None:
+                self.crashes[job_id] = self.crashes.get(job_id, 0) + 1
+                if self.crashes[job_id] > self.max_retries:
+                    self.store.fail(job_id, f"worker crashed (exit code {worker.exitcode})")
+                else:
+                    self.store.requeue(job_id)
+
+            self.failures[index] += 1
+            if self.failures[index] >= self.max_worker_failures:
+                self.given_up.add(index)
+                print(f"Worker {index} exited with code {worker.exitcode} "
+                      f"{self.failures[index]} times in a row, not restarting it")
+                continue
+            delay = min(self.restart_delay * 2 ** (self.failures[index] - 1), self.MAX_RESTART_DELAY)
+            self.restart_at[index] = now + delay
+            print(f"Worker {index} exited with code {worker.exitcode}, restarting in {delay:.1f}s")
+
+    def _collect(self):
+        while self.running:
+            try:
+                kind, job_id, payload = self.events.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if kind == 'progress':
+                self.store.set_progress(job_id, payload)
+                continue
+            if kind == 'ready':
+                # Matched by pid, since the worker may have been replaced meanwhile
+                with self.lock:
+                    self.ready.update(index for index, worker in enumerate(self.workers)
+                                      if worker is not None and worker.pid == payload)
+                continue
+            if kind == 'done':
+                content_hash, result = payload
+                self.store.finish(job_id, content_hash, result)
+            else:
+                self.store.fail(job_id, payload)
+            with self.lock:
+                for index, assigned_id in list(self.assigned.items()):
+                    if assigned_id == job_id:
+                        del self.assigned[index]
+                        # The worker got through a job, so it is sound
+                        self.failures[index] = 0
+            self.crashes.pop(job_id, None)
+
+    def _start_worker(self, index):
+        # A fresh queue: a worker killed mid-read can leave the old one unusable
+        tasks = multiprocessing.Queue()
+        worker = multiprocessing.Process(
+            target=worker_main,
+            args=(tasks, self.events, self.worker_cpus[index], self.backend_factory),
+            daemon=True)
+        worker.start()
+        self.task_queues[index] = tasks
+        self.workers[index] = worker
+
+    def start(self):
+        self.running = True
+        for index in range(self.num_workers):
+            cpus = None
+            if self.threads_per_worker and hasattr(os, 'sched_setaffinity'):
+                cpus = allocate_cpus(self.threads_per_worker)
+            self.worker_cpus.append(cpus)
+            self.task_queues.append(None)
+            self.workers.append(None)
+            self.failures.append(0)
+            self.restart_at.append(0.0)
+            self._start_worker(index)
+        self.threads = [threading.Thread(target=self._dispatch, daemon=True),
+                        threading.Thread(target=self._collect, daemon=True),
+                        threading.Thread(target=self.httpd.serve_forever, daemon=True)]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.running = False
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        for tasks in self.task_queues:
+            tasks.put(None)
+        for worker in self.workers:
+            if worker is None:
+                continue
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        self.workers = []
+        self.task_queues = []
+        self.worker_cpus = []
+        self.failures = []
+        self.restart_at = []
+        self.ready.clear()
+        self.given_up.clear()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def send_json(self, status, body):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                if self.path.rstrip('/') != '/jobs':
+                    self.send_json(404, {'error': 'not found'})
+                    return
+                if not server.healthy:
+                    self.send_json(503, {'error': 'no workers available'})
+                    return
+                length = int(self.headers.get('Content-Length') or 0)
+                if length <= 0:
+                    self.send_json(400, {'error': 'empty upload'})
+                    return
+                try:
+                    content_hash = server.store_upload(self.rfile, length)
+                except ValueError as e:
+                    self.send_json(400, {'error': str(e)})
+                    return
+                job_id = server.store.submit(content_hash)
+                self.send_json(201, server.store.get(job_id))
+
+            def do_GET(self):
+                parts = [p for p in self.path.split('/') if p]
+                if parts == ['jobs']:
+                    self.send_json(200, server.store.list())
+                elif len(parts) == 2 and parts[0] == 'jobs':
+                    job = server.store.get(parts[1])
+                    if job is None:
+                        self.send_json(404, {'error': 'unknown job'})
+                    else:
+                        self.send_json(200, job)
+                else:
+                    self.send_json(404, {'error': 'not found'})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local batch squat analysis server")
+    parser.add_argument('--data-dir', default='job_data')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=max(1, os.cpu_count() // 2))
+    parser.add_argument('--threads-per-worker', type=int, default=None,
+                        help="CPUs each worker's pose model may use")
+    args = parser.parse_args()
+
+    server = JobServer(args.data_dir, workers=args.workers, host=args.host, port=args.port,
+                       threads_per_worker=args.threads_per_worker)
+    server.start()
+    print(f"Job server listening on http://{args.host}:{server.address[1]} "
+          f"with {args.workers} workers")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
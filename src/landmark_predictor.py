@@ -0,0 +1,81 @@
+import numpy as np
+
+class LandmarkPredictor:
+    """Constant-velocity Kalman filter over all 33 landmarks at once.
+
+    Each x and y coordinate is an independent position/velocity filter;
+    all of them are stored as (33, 2) arrays so one update or prediction
+    is a handful of numpy operations. update() takes landmarks measured on
+    a frame captured at some time, predict() extrapolates them to the time
+    the overlay is shown, so the skeleton keeps up with the displayed
+    frame even when inference is slower or less frequent than display.
+    """
+
+    def __init__(self, acceleration_noise=10.0, measurement_noise=2.5e-5,
+                 max_extrapolation=0.25, max_gap=1.0):
+        # acceleration_noise: variance of unmodelled acceleration in
+        # (normalized units / s^2)^2; measurement_noise: landmark jitter
+        # variance in normalized units^2
+        self.acceleration_noise = acceleration_noise
+        self.measurement_noise = measurement_noise
+        self.max_extrapolation = max_extrapolation
+        self.max_gap = max_gap
+        self.reset()
+
+    def reset(self):
+        self.timestamp = None
+        self.position = None
+        self.velocity = None
+        self.last_landmarks = None
+
+    def _start(self, measured, landmarks, timestamp):
+        self.position = measured.copy()
+        self.velocity = np.zeros_like(measured)
+        # Covariance [[p00, p01], [p01, p11]] per coordinate
+        self.p00 = np.full_like(measured, self.measurement_noise)
+        self.p01 = np.zeros_like(measured)
+        self.p11 = np.ones_like(measured)
+        self.timestamp = timestamp
+        self.last_landmarks = landmarks
+
+    def update(self, landmarks, timestamp):
+        """Fold in a (33, 4) landmark measurement; None clears the track."""
+        if landmarks is None:
+            self.reset()
+            return
+        measured = landmarks[:, :2].astype(np.float64)
+        if self.position is None or not 0 < timestamp - self.timestamp <= self.max_gap:
+            self._start(measured, landmarks, timestamp)
+            return
+
+        dt = timestamp - self.timestamp
+        q = self.acceleration_noise
+
+        # Predict: x += v dt, P = F P F^T + Q (white acceleration)
+        self.position += self.velocity * dt
+        p00 = self.p00 + dt * (2 * self.p01 + dt * self.p11) + q * dt ** 4 / 4
+        p01 = self.p01 + dt * self.p11 + q * dt ** 3 / 2
+        p11 = self.p11 + q * dt ** 2
+
+        # Correct with the measured positions
+        innovation = measured - self.position
+        s = p00 + self.measurement_noise
+        k0 = p00 / s
+        k1 = p01 / s
+        self.position += k0 * innovation
+        self.velocity += k1 * innovation
+        self.p00 = (1 - k0) * p00
+        self.p01 = (1 - k0) * p01
+        self.p11 = p11 - k1 * p01
+
+        self.timestamp = timestamp
+        self.last_landmarks = landmarks
+
+    def predict(self, timestamp):
+        """Landmarks extrapolated to timestamp, or None without a track."""
+        if self.position is None:
+            return None
+        dt = min(max(timestamp - self.timestamp, 0.0), self.max_extrapolation)
+        predicted = self.last_landmarks.copy()
+        predicted[:, :2] = self.position + self.velocity * dt
+        return predicted
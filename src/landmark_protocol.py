@@ -0,0 +1,207 @@
+import argparse
+import random
+import socket
+import struct
+from collections import deque, namedtuple
+
+import numpy as np
+
+from pose_detector import PoseDetector
+
+# Wire format, little-endian, one UDP datagram per frame:
+#   magic 'SQLM' | version u8 | flags u8 | station u16 | session u16 |
+#   sequence u32 | timestamp f64 | frame width u16 | frame height u16 |
+#   33 x (x, y, z, visibility) f32
+# A sender picks a new session id whenever it (re)starts counting
+# sequences from 0, so the receiver can tell a restart from late packets.
+MAGIC = b'SQLM'
+VERSION = 2
+FLAG_POSE = 0x01  # landmarks are valid; cleared when no pose was found
+NUM_LANDMARKS = 33
+HEADER = struct.Struct('<4sBBHHIdHH')
+PAYLOAD_SIZE = NUM_LANDMARKS * 4 * 4
+PACKET_SIZE = HEADER.size + PAYLOAD_SIZE
+DEFAULT_PORT = 5005
+
+LandmarkPacket = namedtuple('LandmarkPacket', [
+    'station_id', 'session', 'sequence', 'timestamp', 'frame_width', 'frame_height', 'landmarks'
+])
+
+
+def encode_packet(station_id, session, sequence, timestamp, frame_size, landmarks=None):
+    """Encode one frame's landmarks; landmarks is a (33, 4) array or None."""
+    width, height = frame_size
+    flags = 0
+    if landmarks is None:
+        payload = bytes(PAYLOAD_SIZE)
+    else:
+        flags |= FLAG_POSE
+        payload = np.ascontiguousarray(landmarks, dtype='<f4').tobytes()
+        if len(payload) != PAYLOAD_SIZE:
+            raise ValueError(f"expected {NUM_LANDMARKS}x4 landmarks")
+    header = HEADER.pack(MAGIC, VERSION, flags, station_id, session & 0xFFFF,
+                         sequence & 0xFFFFFFFF, timestamp, width, height)
+    return header + payload
+
+
+def decode_packet(data):
+    """Decode a datagram into a LandmarkPacket. Raises ValueError if malformed."""
+    if len(data) != PACKET_SIZE:
+        raise ValueError(f"bad packet size {len(data)}")
+    magic, version, flags, station_id, session, sequence, timestamp, width, height = \
+        HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a landmark packet")
+    landmarks = None
+    if flags & FLAG_POSE:
+        landmarks = np.frombuffer(data, dtype='<f4', offset=HEADER.size).reshape(NUM_LANDMARKS, 4)
+    return LandmarkPacket(station_id, session, sequence, timestamp, width, height, landmarks)
+
+
+class LandmarkSender:
+    """Runs on the capture device: sends landmarks instead of frames."""
+
+    def __init__(self, host, port=DEFAULT_PORT, station_id=0):
+        self.address = (host, port)
+        self.station_id = station_id
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.new_session()
+
+    def new_session(self):
+        """Start over from sequence 0; the receiver resets this station's rep count."""
+        previous = getattr(self, 'session', None)
+        self.session = random.randrange(0x10000)
+        while self.session == previous:
+            self.session = random.randrange(0x10000)
+        self.sequence = 0
+
+    def send(self, landmarks, timestamp, frame_size):
+        self.sock.sendto(encode_packet(self.station_id, self.session, self.sequence, timestamp,
+                                       frame_size, landmarks), self.address)
+        self.sequence += 1
+
+    def close(self):
+        self.sock.close()
+
+
+class LandmarkReceiver:
+    """Feeds landmark packets from many stations into per-station rep logic.
+
+    Each station gets its own PoseDetector, which never loads the pose
+    model because only process_landmarks is called. Late or duplicate
+    datagrams (sequence not newer than the last one seen) are dropped.
+    A packet with a new session id means the sender restarted: the
+    station's rep logic is reset and its sequence tracking starts over.
+    Stragglers from the sessions it replaced are dropped. A sender starts
+    its station over by calling LandmarkSender.new_session(); stations
+    count every rep unless max_reps is given.
+    """
+
+    RETIRED_SESSIONS = 4
+
+    def __init__(self, host='0.0.0.0', port=DEFAULT_PORT, on_metrics=None, max_reps=None):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.on_metrics = on_metrics
+        self.max_reps = max_reps
+        self.detectors = {}
+        self.last_sequence = {}
+        self.sessions = {}
+        self.retired_sessions = {}
+        self.dropped = 0
+        self.running = False
+
+    @property
+    def address(self):
+        return self.sock.getsockname()
+
+    def detector(self, station_id):
+        if station_id not in self.detectors:
+            self.detectors[station_id] = PoseDetector(max_reps=self.max_reps)
+        return self.detectors[station_id]
+
+    def reset_station(self, station_id):
+        """Start a station's rep count and tracking over, e.g. for a new athlete."""
+        if station_id in self.detectors:
+            self.detectors[station_id].reset_tracking()
+
+    def handle(self, data):
+        try:
+            packet = decode_packet(data)
+        except ValueError:
+            self.dropped += 1
+            return None
+
+        station_id = packet.station_id
+        session = self.sessions.get(station_id)
+        if session is not None and packet.session != session:
+            retired = self.retired_sessions.setdefault(station_id, deque(maxlen=self.RETIRED_SESSIONS))
+            if packet.session in retired:
+                self.dropped += 1
+                return None
+            # The sender restarted
+            retired.append(session)
+            self.last_sequence.pop(station_id, None)
+            self.reset_station(station_id)
+        self.sessions[station_id] = packet.session
+
+        last = self.last_sequence.get(station_id)
+        # Serial number arithmetic so the u32 sequence can wrap around
+        if last is not None and not 0 < (packet.sequence - last) & 0xFFFFFFFF < 0x80000000:
+            self.dropped += 1
+            return None
+        self.last_sequence[station_id] = packet.sequence
+
+        metrics = self.detector(packet.station_id).process_landmarks(
+            packet.landmarks, packet.frame_height, packet.timestamp)
+        metrics['station_id'] = packet.station_id
+        if self.on_metrics:
+            self.on_metrics(packet.station_id, metrics)
+        return metrics
+
+    def serve_forever(self, timeout=0.5):
+        self.running = True
+        self.sock.settimeout(timeout)
+        while self.running:
+            try:
+                data, _ = self.sock.recvfrom(PACKET_SIZE + 1)
+            except socket.timeout:
+                continue
+            self.handle(data)
+
+    def stop(self):
+        self.running = False
+
+    def close(self):
+        self.stop()
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Receive landmark streams from capture stations")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-reps', type=int, default=None,
+                        help="stop counting a station at this many reps until its sender restarts")
+    args = parser.parse_args()
+
+    counts = {}
+
+    def report(station_id, metrics):
+        if counts.get(station_id) != metrics['squat_count']:
+            counts[station_id] = metrics['squat_count']
+            print(f"Station {station_id}: {metrics['squat_count']} reps")
+
+    receiver = LandmarkReceiver(args.host, args.port, on_metrics=report,
+                                max_reps=args.max_reps)
+    print(f"Listening for landmark packets on {args.host}:{args.port}")
+    try:
+        receiver.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+
+import cv2
+import numpy as np
+
+from pose_detector import PoseDetector
+
+# A trace is an .npz file holding one session's pose inference output:
+#   landmarks     (N, 33, 4) float32, NaN rows for frames without a pose
+#   timestamps    (N,) float64 seconds
+#   frame_height  scalar, pixel height the landmarks were normalized to
+#   frame_width   scalar
+
+
+def save_trace(path, landmarks, timestamps, frame_size):
+    """Save per-frame landmark arrays (None where no pose was found)."""
+    stacked = np.full((len(landmarks), 33, 4), np.nan, dtype=np.float32)
+    for i, frame_landmarks in enumerate(landmarks):
+        if frame_landmarks is not None:
+            stacked[i] = frame_landmarks
+    width, height = frame_size
+    np.savez_compressed(path, landmarks=stacked,
+                        timestamps=np.asarray(timestamps, dtype=np.float64),
+                        frame_width=width, frame_height=height)
+
+
+def load_trace(path):
+    with np.load(path) as data:
+        return {
+            'landmarks': data['landmarks'],
+            'timestamps': data['timestamps'],
+            'frame_width': int(data['frame_width']),
+            'frame_height': int(data['frame_height'])
+        }
+
+
+def iter_trace(trace):
+    """Yield (landmarks or None, timestamp) for every frame of a trace."""
+    for frame_landmarks, timestamp in zip(trace['landmarks'], trace['timestamps']):
+        if np.isnan(frame_landmarks[0, 0]):
+            yield None, float(timestamp)
+        else:
+            yield frame_landmarks, float(timestamp)
+
+
+def record_trace(video_path, trace_path):
+    """Run pose inference over a video once and save the landmark trace."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video {video_path}")
+
+    pose_detector = PoseDetector()
+    landmarks, timestamps = [], []
+    frame_size = None
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_size = (frame.shape[1], frame.shape[0])
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            metrics = pose_detector.detect_pose(frame, timestamp)
+            landmarks.append(metrics['landmarks'])
+            timestamps.append(timestamp)
+    finally:
+        cap.release()
+
+    if frame_size is None:
+        raise ValueError(f"No frames read from {video_path}")
+    save_trace(trace_path, landmarks, timestamps, frame_size)
+    return len(landmarks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a landmark trace from a video")
+    parser.add_argument('video')
+    parser.add_argument('trace')
+    args = parser.parse_args()
+    frames = record_trace(args.video, args.trace)
+    print(f"Saved {frames} frames to {args.trace}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,56 @@
-import cv2
+import argparse
 import pygame
+import time
 from pose_detector import PoseDetector
 from gui import GUI
+from frame_pool import FramePool
+from capture import open_capture
+from landmark_predictor import LandmarkPredictor
+from quality_controller import AdaptiveQualityController
+from inference_worker import InferenceServer
+from motion_gate import MotionGate
+from rep_thumbnails import RepThumbnailStore
+from session_timeline import SessionTimeline
+from rep_template import load_matcher
 
-def main():
+def main(use_inference_worker=False, template_paths=()):
     try:
         print("Initializing Squat Form Analyzer...")
         
-        # Initialize camera
-        cap = cv2.VideoCapture(0)
+        # Coach reference reps each completed rep is scored against
+        rep_matcher = load_matcher(template_paths)
+        if rep_matcher is not None:
+            print(f"Comparing reps against {len(rep_matcher.templates)} template(s)")
+        
+        # Initialize camera (MJPG, minimal buffering, always the newest frame)
+        cap = open_capture(0, width=1280, height=720)
         if not cap.isOpened():
             print("Error: Could not open camera")
             return
         
-        # Set camera properties
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        
         pose_detector = PoseDetector()
+        pose_detector.landmark_predictor = LandmarkPredictor()
+        pose_detector.thumbnail_store = RepThumbnailStore()
+        pose_detector.timeline = SessionTimeline()
+        pose_detector.rep_matcher = rep_matcher
         gui = GUI()
+        gui.timeline = pose_detector.timeline
+        frame_pool = FramePool()
+        captured = None
+        
+        # Adjust pose input size, model and inference stride to hold the frame rate
+        quality = AdaptiveQualityController(target_fps=25)
+        quality.apply(pose_detector)
+        frame_index = 0
+        last_loop = time.monotonic()
+        
+        # Optionally run pose inference in a separate process so the UI never
+        # waits on the model; the stream is opened once the frame size is known
+        inference = InferenceServer().start() if use_inference_worker else None
+        inference_stream = None
+        
+        # Reuse the last landmarks while the picture is static
+        motion_gate = MotionGate()
         
         print("\nControls:")
         print("SPACE - Start")
@@ -30,21 +62,53 @@ def main():
             if result == "SHOW_SUMMARY":
                 # Show summary before resetting
                 gui.show_summary = True
-                gui.show_session_summary(pose_detector.squat_history)
+                gui.show_session_summary(pose_detector.squat_history,
+                                         pose_detector.thumbnail_store)
             elif result == "RESET":
+                pose_detector.thumbnail_store.close()
                 pose_detector = PoseDetector()  # Create new detector
+                pose_detector.landmark_predictor = LandmarkPredictor()
+                pose_detector.thumbnail_store = RepThumbnailStore()
+                pose_detector.timeline = SessionTimeline()
+                pose_detector.rep_matcher = rep_matcher
+                gui.timeline = pose_detector.timeline
+                quality.apply(pose_detector)
                 running = True
             elif result == False:
                 running = False
             
-            ret, frame = cap.read()
+            # Decode into last frame's buffer and mirror into a pooled one
+            ret, captured = cap.read(captured)
             if not ret:
+                captured = None
                 continue
             
-            frame = cv2.flip(frame, 1)
+            frame = frame_pool.flip('mirrored', captured)
             
-            if gui.recording:
-                metrics = pose_detector.detect_pose(frame)
+            inference_time = None
+            captured_at = time.time()
+            if gui.recording and inference is not None:
+                if inference_stream is None:
+                    inference_stream = inference.open_stream(frame.shape)
+                    quality.apply_stream(inference_stream)
+                # A frame the worker drops was not inferred, so it must not
+                # become the gate's reference
+                if (quality.should_infer(frame_index) and
+                        motion_gate.should_infer(frame, captured_at, commit=False) and
+                        inference_stream.submit(frame, captured_at)):
+                    motion_gate.accept(captured_at)
+                polled = inference_stream.poll()
+                results = [(landmarks, timestamp) for landmarks, timestamp, _ in polled]
+                metrics = pose_detector.apply_results(frame, results, captured_at)
+                # Worker time spent on the results that came back this loop
+                inference_time = sum(seconds for _, _, seconds in polled)
+            elif gui.recording:
+                inference_start = time.monotonic()
+                run_inference = (quality.should_infer(frame_index) and
+                                 motion_gate.should_infer(frame, captured_at))
+                metrics = pose_detector.detect_pose(
+                    frame, captured_at, run_inference=run_inference)
+                inference_time = time.monotonic() - inference_start
             else:
                 metrics = {
                     'knee_angle': 180,
@@ -54,14 +118,40 @@ def main():
                 }
             
             gui.update_display(frame, metrics)
-            pygame.time.wait(10)
+            # Poll less often while nothing in front of the camera moves
+            pygame.time.wait(50 if gui.recording and motion_gate.idle(captured_at) else 10)
+            
+            now = time.monotonic()
+            if quality.frame_done(now - last_loop, inference_time):
+                quality.apply(pose_detector)
+                if inference_stream is not None:
+                    quality.apply_stream(inference_stream)
+            last_loop = now
+            frame_index += 1
         
     except Exception as e:
         print(f"Fatal error: {e}")
     finally:
+        if locals().get('inference') is not None:
+            inference.stop()
+        if locals().get('pose_detector') is not None:
+            pose_detector.thumbnail_store.close()
         if 'cap' in locals():
+            stats = cap.latency_stats()
+            if stats:
+                age = "n/a" if stats['mean_ms'] is None else \
+                    f"mean {stats['mean_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms"
+                print(f"Capture frame age ({stats['source']}, {stats['clock']} clock): {age}; "
+                      f"read wait mean {stats['wait_mean_ms']:.1f} ms, "
+                      f"{stats['discarded']} stale frames dropped")
             cap.release()
         pygame.quit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Live squat form analyzer")
+    parser.add_argument('--inference-worker', action='store_true',
+                        help="run pose inference in a separate process")
+    parser.add_argument('--template', action='append', default=[],
+                        help="coach reference rep to score each rep against (repeatable)")
+    args = parser.parse_args()
+    main(use_inference_worker=args.inference_worker, template_paths=args.template)
\ No newline at end of file
@@ -0,0 +1,72 @@
+import cv2
+
+from frame_pool import FramePool
+
+class MotionGate:
+    """Skips pose inference on frames that barely differ from the last inferred one.
+
+    Frames are shrunk to a tiny grayscale thumbnail and compared with the
+    thumbnail of the last frame that was inferred (not just the previous
+    frame, so slow drift still adds up). Inference runs when the mean
+    absolute difference reaches threshold (0-255 gray levels) or when
+    refresh_interval seconds have passed, so landmarks never go stale.
+
+    When inference may still be refused after the gate says yes (e.g. an
+    inference worker dropping the frame), call should_infer with
+    commit=False and accept() only once the frame was really taken.
+    """
+
+    def __init__(self, threshold=3.0, size=(64, 48), refresh_interval=1.0, idle_after=5.0):
+        self.threshold = threshold
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self.idle_after = idle_after
+        self.frame_pool = FramePool()
+        self.reference = None
+        self.candidate = None
+        self.last_inferred = None
+        self.last_motion = None
+        self.skipped = 0
+        self.last_score = 0.0
+
+    def reset(self):
+        self.reference = None
+        self.last_inferred = None
+
+    def should_infer(self, frame, timestamp, commit=True):
+        small = self.frame_pool.resize('small', frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY,
+                            dst=self.frame_pool.get('gray', small.shape[:2]))
+
+        if self.reference is None:
+            self.last_motion = timestamp
+            return self._accept(gray, timestamp, commit)
+
+        difference = cv2.absdiff(gray, self.reference,
+                                 dst=self.frame_pool.get('difference', gray.shape))
+        self.last_score = cv2.mean(difference)[0]
+        if self.last_score >= self.threshold:
+            self.last_motion = timestamp
+            return self._accept(gray, timestamp, commit)
+        if timestamp - self.last_inferred >= self.refresh_interval:
+            return self._accept(gray, timestamp, commit)
+
+        self.skipped += 1
+        return False
+
+    def _accept(self, gray, timestamp, commit=True):
+        self.candidate = gray
+        if commit:
+            self.accept(timestamp)
+        return True
+
+    def accept(self, timestamp):
+        """Make the frame last passed to should_infer the new reference."""
+        reference = self.frame_pool.get('reference', self.candidate.shape)
+        reference[...] = self.candidate
+        self.reference = reference
+        self.last_inferred = timestamp
+
+    def idle(self, timestamp):
+        """True once nothing has moved for idle_after seconds."""
+        return self.last_motion is not None and timestamp - self.last_motion >= self.idle_after
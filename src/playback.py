@@ -0,0 +1,79 @@
+import math
+import time
+import cv2
+
+class PlaybackScheduler:
+    """Paces file playback by frame presentation timestamps.
+
+    Frames are shown when the monotonic clock reaches their timestamp
+    (relative to when playback was anchored), so time spent on inference
+    is absorbed instead of added on top of a fixed delay. When playback
+    falls behind, frames_behind() tells the caller how many frames to
+    grab without decoding. In max_speed mode nothing waits or skips.
+    """
+
+    def __init__(self, fps=None, max_speed=False, max_lag=0.1, default_fps=30.0):
+        if fps is None or not math.isfinite(fps) or fps <= 0:
+            fps = default_fps
+        self.frame_interval = 1.0 / fps
+        self.max_speed = max_speed
+        self.max_lag = max_lag
+        self.frame_count = 0
+        self.reset()
+
+    def reset(self):
+        """Drop the clock anchor, e.g. after a pause, seek or replay."""
+        self.clock_start = None
+        self.media_start = None
+        self.last_time = None
+
+    def rewind(self):
+        """Reset after the source was seeked back to its first frame."""
+        self.frame_count = 0
+        self.reset()
+
+    def frame_time(self, cap):
+        """Presentation time in seconds of the frame just read from cap."""
+        self.frame_count += 1
+        msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+        if msec and math.isfinite(msec) and msec > 0:
+            return msec / 1000.0
+        # Some backends do not report timestamps; fall back to frame counting
+        return (self.frame_count - 1) * self.frame_interval
+
+    def media_position(self):
+        """Media time that should be on screen right now."""
+        if self.clock_start is None:
+            return None
+        return self.media_start + (time.monotonic() - self.clock_start)
+
+    def frames_behind(self):
+        """Number of frames to skip so the next decoded frame is on time."""
+        if self.max_speed or self.last_time is None:
+            return 0
+        lag = self.media_position() - (self.last_time + self.frame_interval)
+        if lag <= self.max_lag:
+            return 0
+        return int(lag / self.frame_interval)
+
+    def skipped(self, count):
+        """Account for frames grabbed but not decoded."""
+        self.frame_count += count
+        if self.last_time is not None:
+            self.last_time += count * self.frame_interval
+
+    def wait(self, timestamp):
+        """Sleep until the frame at timestamp is due. Returns seconds waited."""
+        if self.clock_start is None or (self.last_time is not None and timestamp < self.last_time):
+            # First frame, or the source looped/seeked backwards
+            self.clock_start = time.monotonic()
+            self.media_start = timestamp
+        self.last_time = timestamp
+        if self.max_speed:
+            return 0.0
+
+        delay = (timestamp - self.media_start) - (time.monotonic() - self.clock_start)
+        if delay > 0:
+            time.sleep(delay)
+            return delay
+        return 0.0
@@ -0,0 +1,188 @@
+import argparse
+import os
+import threading
+import time
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from frame_pool import FramePool
+
+
+def landmarks_to_array(landmarks):
+    """Pack MediaPipe landmarks into a (33, 4) float32 array of x, y, z, visibility."""
+    return np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks], dtype=np.float32)
+
+
+_cpu_lock = threading.Lock()
+_next_cpu = 0
+
+
+def allocate_cpus(count):
+    """Hand out count CPUs round-robin, so detectors on one host spread out."""
+    global _next_cpu
+    available = sorted(os.sched_getaffinity(0))
+    count = max(1, min(count, len(available)))
+    with _cpu_lock:
+        start = _next_cpu
+        _next_cpu = (_next_cpu + count) % len(available)
+    return {available[(start + i) % len(available)] for i in range(count)}
+
+
+class PoseBackend:
+    """Pose inference behind PoseDetector, AnalysisPipeline and the inference workers.
+
+    process() takes a BGR frame and returns a (33, 4) landmark array (see
+    landmarks_to_array) or None when no pose was found. Backends keep any
+    tracking state between calls, so use one per video stream.
+    """
+
+    model_complexity = None
+    input_width = None
+
+    def process(self, frame):
+        raise NotImplementedError
+
+    def set_model_complexity(self, model_complexity):
+        pass
+
+    def close(self):
+        pass
+
+
+class MediaPipeBackend(PoseBackend):
+    """MediaPipe Pose, created on first use so landmark-only consumers never load it.
+
+    model_complexity picks the model variant (0-2) and input_width the
+    width frames are downscaled to before inference (None keeps the full
+    frame). MediaPipe does not expose its thread count, so num_threads
+    instead confines the model to that many CPUs, picked round-robin
+    (or give cpus explicitly). The graph's threads inherit the CPU affinity
+    of the thread that creates the model, so only creation runs pinned.
+    """
+
+    def __init__(self, model_complexity=1, input_width=None, num_threads=None, cpus=None,
+                 min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        self.mp_pose = mp.solutions.pose
+        self.model_complexity = model_complexity
+        self.input_width = input_width
+        self.min_detection_confidence = min_detection_confidence
+        self.min_tracking_confidence = min_tracking_confidence
+        if cpus is None and num_threads and hasattr(os, 'sched_setaffinity'):
+            cpus = allocate_cpus(num_threads)
+        self.cpus = cpus
+        self.frame_pool = FramePool()
+        self._pose = None
+
+    @property
+    def pose(self):
+        if self._pose is None:
+            self._pose = self._create_pose()
+        return self._pose
+
+    def _create_pose(self):
+        def create():
+            return self.mp_pose.Pose(
+                model_complexity=self.model_complexity,
+                min_detection_confidence=self.min_detection_confidence,
+                min_tracking_confidence=self.min_tracking_confidence
+            )
+
+        if not self.cpus or not hasattr(os, 'sched_setaffinity'):
+            return create()
+        # pid 0 is the calling thread only, not the whole process
+        previous = os.sched_getaffinity(0)
+        os.sched_setaffinity(0, self.cpus)
+        try:
+            return create()
+        finally:
+            os.sched_setaffinity(0, previous)
+
+    def set_model_complexity(self, model_complexity):
+        if model_complexity == self.model_complexity:
+            return
+        self.model_complexity = model_complexity
+        self.close()
+
+    def prepare_input(self, frame):
+        """RGB copy of the frame for the model, downscaled to input_width if set.
+
+        Landmarks are normalized to the image size, so they still line up
+        with the full-size frame.
+        """
+        height, width = frame.shape[:2]
+        if self.input_width and width > self.input_width:
+            input_height = int(height * (self.input_width / width))
+            frame = self.frame_pool.resize('input', frame, (self.input_width, input_height),
+                                           interpolation=cv2.INTER_AREA)
+        return self.frame_pool.cvt_color('rgb', frame, cv2.COLOR_BGR2RGB)
+
+    def process(self, frame):
+        results = self.pose.process(self.prepare_input(frame))
+        if not results.pose_landmarks:
+            return None
+        return landmarks_to_array(results.pose_landmarks.landmark)
+
+    def close(self):
+        if self._pose is not None:
+            self._pose.close()
+            self._pose = None
+
+
+class ReplayBackend(PoseBackend):
+    """Serves recorded landmark arrays instead of running a model.
+
+    Each process() call returns the next recorded frame and ignores the
+    frame it is given, so everything downstream of inference can be
+    profiled or load-tested at full speed, even on blank frames.
+    """
+
+    def __init__(self, landmarks, loop=True):
+        self.landmarks = list(landmarks)
+        self.loop = loop
+        self.position = 0
+
+    @classmethod
+    def from_trace(cls, path, loop=True):
+        """Replay a landmark_trace .npz recording."""
+        # landmark_trace imports pose_detector, which imports this module
+        from landmark_trace import iter_trace, load_trace
+        return cls((landmarks for landmarks, _ in iter_trace(load_trace(path))), loop)
+
+    def reset(self):
+        self.position = 0
+
+    def process(self, frame):
+        if self.position >= len(self.landmarks):
+            if not self.loop or not self.landmarks:
+                return None
+            self.position = 0
+        landmarks = self.landmarks[self.position]
+        self.position += 1
+        return landmarks
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time everything after pose inference by replaying a landmark trace")
+    parser.add_argument('trace')
+    parser.add_argument('--frames', type=int, default=3000)
+    args = parser.parse_args()
+
+    from landmark_trace import load_trace
+    from pose_detector import PoseDetector
+
+    trace = load_trace(args.trace)
+    pose_detector = PoseDetector(backend=ReplayBackend.from_trace(args.trace))
+    frame = np.zeros((trace['frame_height'], trace['frame_width'], 3), dtype=np.uint8)
+    start = time.perf_counter()
+    for i in range(args.frames):
+        pose_detector.detect_pose(frame, i / 30.0)
+    elapsed = time.perf_counter() - start
+    print(f"{args.frames} frames in {elapsed:.2f}s ({args.frames / elapsed:.0f} fps), "
+          f"{pose_detector.squat_count} reps")
+
+
+if __name__ == "__main__":
+    main()
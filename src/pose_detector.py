@@ -1,28 +1,87 @@
 import mediapipe as mp
 import cv2
 import numpy as np
-from collections import deque
+from collections import deque, namedtuple
 import time
+from pose_backend import MediaPipeBackend, landmarks_to_array
+
+Landmark = namedtuple('Landmark', ['x', 'y', 'z', 'visibility'])
+
+def landmarks_from_array(array):
+    """Unpack a (33, 4) landmark array into points with x/y/z/visibility attributes."""
+    return [Landmark(*row) for row in array.tolist()]
+
+def draw_skeleton(frame, landmarks, min_visibility=0.5):
+    """Draw landmarks given as points, in mp.solutions.drawing_utils' default colors."""
+    h, w = frame.shape[:2]
+    points = [(int(lm.x * w), int(lm.y * h)) if lm.visibility >= min_visibility else None
+              for lm in landmarks]
+    for start, end in mp.solutions.pose.POSE_CONNECTIONS:
+        if points[start] and points[end]:
+            cv2.line(frame, points[start], points[end], (224, 224, 224), 2)
+    for point in points:
+        if point:
+            cv2.circle(frame, point, 2, (0, 0, 255), 2)
 
 class PoseDetector:
-    def __init__(self):
+    def __init__(self, squat_entry_angle=140, standing_angle=160, depth_factor=0.4, backend=None,
+                 max_reps=10):
+        # Rep thresholds: knee angle (degrees) that starts a rep, knee angle
+        # counted as standing, and hip drop (fraction of standing hip height)
+        # that counts as 100% depth
+        self.squat_entry_angle = squat_entry_angle
+        self.standing_angle = standing_angle
+        self.depth_factor = depth_factor
+        # The live session ends after max_reps reps; None counts without limit
+        self.max_reps = max_reps
         self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-        self.mp_draw = mp.solutions.drawing_utils
+        # Pose inference; MediaPipe by default, or e.g. a ReplayBackend
+        self.backend = backend if backend is not None else MediaPipeBackend()
+        self.last_landmarks = None
+        self.inferred = False
+        self.last_metrics = None
+        # Optional RepTemplateMatcher scoring each rep against reference reps
+        self.rep_matcher = None
+        # Optional LandmarkPredictor; when set, overlays are drawn from
+        # landmarks predicted to display time
+        self.landmark_predictor = None
+        # Optional RepThumbnailStore keeping each rep's lowest-point frame
+        self.thumbnail_store = None
+        # Optional SessionTimeline collecting knee angle and depth per frame
+        self.timeline = None
         self.reset_tracking()
         self.squat_start_time = None
         self.initial_ankle_distance = None
         self.initial_knee_position = None
         
+    @property
+    def model_complexity(self):
+        return self.backend.model_complexity
+        
+    @property
+    def input_width(self):
+        return self.backend.input_width
+        
+    @input_width.setter
+    def input_width(self, input_width):
+        # Inference cost knob, see MediaPipeBackend
+        self.backend.input_width = input_width
+        
+    def set_model_complexity(self, model_complexity):
+        self.backend.set_model_complexity(model_complexity)
+        
+
+    def reached_max_reps(self):
+        return self.max_reps is not None and self.squat_count >= self.max_reps
+
     def reset_tracking(self):
         self.initial_hip_height = None
         self.squat_count = 0
         self.in_squat = False
         self.squat_history = []
         self.current_squat = None
+        # Set by update_reps when the current rep reaches a new lowest angle
+        self.new_lowest = False
         
     def calculate_angle(self, p1, p2, p3):
         # Convert points to numpy arrays
@@ -76,88 +135,221 @@ class PoseDetector:
         width = abs(left_ankle.x - right_ankle.x) * 100
         return width
 
-    def detect_pose(self, frame):
-        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.pose.process(image)
+    def detect_pose(self, frame, timestamp=None, run_inference=True, display_time=None):
+        if timestamp is None:
+            timestamp = time.time()
+        fresh = run_inference or not self.inferred
+        if fresh:
+            self.last_landmarks = self.backend.process(frame)
+            self.inferred = True
+        # Otherwise reuse the previous landmarks on frames the caller chose to skip
+        landmarks = self.last_landmarks
+        capped = self.reached_max_reps()
+        
+        if self.landmark_predictor is not None:
+            # Draw where the athlete is at display time, not where inference saw them
+            metrics = self.process_landmarks(landmarks, frame.shape[0], timestamp)
+            if fresh:
+                self.landmark_predictor.update(metrics['landmarks'], timestamp)
+            predicted = self.landmark_predictor.predict(
+                timestamp if display_time is None else display_time)
+            if predicted is not None and not capped:
+                self.draw_overlay(frame, landmarks_from_array(predicted))
+            self.update_thumbnail(frame)
+            metrics['frame'] = frame
+            return metrics
+        
+        metrics = self.process_landmarks(landmarks, frame.shape[0], timestamp, frame)
+        
+        if landmarks is not None and not capped:
+            points = landmarks_from_array(landmarks)
+            # Draw skeleton
+            self.draw_skeleton(frame, points)
+            
+            # Draw visual guides including foot width
+            self.draw_guides(frame, points)
+            
+        self.update_thumbnail(frame)
+        metrics['frame'] = frame
+        return metrics
+
+    def apply_results(self, frame, results, display_time):
+        """Use landmarks inferred elsewhere (e.g. an InferenceServer worker).
+
+        results are (landmarks or None, capture timestamp) pairs in capture
+        order, possibly none for this frame. Each goes through the rep
+        logic; the overlay is drawn on the frame being shown, predicted to
+        display_time when a landmark_predictor is set.
+        """
+        capped = self.reached_max_reps()
+        for landmarks, timestamp in results:
+            self.last_metrics = self.process_landmarks(landmarks, frame.shape[0], timestamp)
+            if self.landmark_predictor is not None:
+                self.landmark_predictor.update(landmarks, timestamp)
         
+        if self.last_metrics is None:
+            metrics = {
+                'knee_angle': 180,
+                'depth_percentage': 0,
+                'squat_count': self.squat_count,
+                'landmarks': None,
+                'timestamp': display_time
+            }
+        else:
+            metrics = dict(self.last_metrics)
+        
+        if self.landmark_predictor is not None:
+            overlay = self.landmark_predictor.predict(display_time)
+        else:
+            overlay = metrics['landmarks']
+        if overlay is not None and not capped:
+            self.draw_overlay(frame, landmarks_from_array(overlay))
+        self.update_thumbnail(frame)
+        metrics['frame'] = frame
+        return metrics
+
+    def update_thumbnail(self, frame):
+        """Hand the frame to thumbnail_store at a new lowest point; commit finished reps."""
+        if self.thumbnail_store is None:
+            return
+        if self.new_lowest:
+            self.thumbnail_store.capture(frame)
+            self.new_lowest = False
+        if len(self.squat_history) > self.thumbnail_store.committed:
+            self.thumbnail_store.commit(len(self.squat_history) - 1)
+
+    def draw_overlay(self, frame, landmarks):
+        """Depth lines, skeleton and guides for landmarks given as points."""
+        if self.initial_hip_height:
+            hip = landmarks[self.mp_pose.PoseLandmark.LEFT_HIP]
+            self.draw_depth_lines(frame, hip.y * frame.shape[0])
+        self.draw_skeleton(frame, landmarks)
+        self.draw_guides(frame, landmarks)
+
+    def draw_skeleton(self, frame, landmarks, min_visibility=0.5):
+        draw_skeleton(frame, landmarks, min_visibility)
+
+    def process_landmarks(self, landmarks, frame_height, timestamp, frame=None):
+        """Run the metric and rep logic on one frame's landmarks.
+
+        landmarks may be MediaPipe landmarks, a (33, 4) array from
+        landmarks_to_array, or None when no pose was found. Guide lines are
+        drawn only when a frame is given, so remote landmark streams can
+        share this path without ever decoding an image.
+        """
         metrics = {
             'knee_angle': 180,
             'depth_percentage': 0,
             'squat_count': self.squat_count,
-            'frame': frame
+            'frame': frame,
+            'landmarks': None,
+            'timestamp': timestamp
         }
         
-        if self.squat_count >= 10:  # Check if we've reached 10 reps
+        if landmarks is not None:
+            if isinstance(landmarks, np.ndarray):
+                metrics['landmarks'] = landmarks
+                landmarks = landmarks_from_array(landmarks)
+            else:
+                metrics['landmarks'] = landmarks_to_array(landmarks)
+        
+        if self.reached_max_reps():
             self.recording = False
             return metrics
         
-        if results.pose_landmarks:
-            landmarks = results.pose_landmarks.landmark
+        if landmarks is not None:
             hip = landmarks[self.mp_pose.PoseLandmark.LEFT_HIP]
             knee = landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE]
             ankle = landmarks[self.mp_pose.PoseLandmark.LEFT_ANKLE]
             
             knee_angle = self.calculate_angle(hip, knee, ankle)
-            hip_height = hip.y * frame.shape[0]
+            hip_height = hip.y * frame_height
             
-            if knee_angle > 160:  # Standing position
-                self.initial_hip_height = hip_height
+            # Calculate foot width
+            foot_width = self.calculate_foot_width(landmarks)
+            
+            was_in_squat = self.in_squat
+            completed = self.update_reps(knee_angle, hip_height, foot_width, timestamp)
+            if completed:
+                metrics['squat_count'] = self.squat_count
             
             if self.initial_hip_height:
-                current_drop = hip_height - self.initial_hip_height
-                max_drop = self.initial_hip_height * 0.4
-                depth_percentage = min(100, (current_drop / max_drop) * 100)
-                
                 metrics['knee_angle'] = knee_angle
-                metrics['depth_percentage'] = depth_percentage
-                
-                # Draw guide lines
-                h, w, _ = frame.shape
+                metrics['depth_percentage'] = self.depth_percentage(hip_height)
+                if self.timeline is not None:
+                    self.timeline.append(timestamp, knee_angle, metrics['depth_percentage'],
+                                         rep_started=self.in_squat and not was_in_squat,
+                                         rep_completed=completed)
                 
-                # Standing position line (green)
-                y_stand = int(self.initial_hip_height)
-                cv2.line(frame, (0, y_stand), (w, y_stand), (0, 255, 0), 2)
-                
-                # Target depth line (red)
-                y_target = int(self.initial_hip_height + (self.initial_hip_height * 0.4))
-                cv2.line(frame, (0, y_target), (w, y_target), (0, 0, 255), 2)
-                
-                # Current hip position line (blue)
-                y_current = int(hip_height)
-                cv2.line(frame, (0, y_current), (w, y_current), (255, 0, 0), 1)
-                
-                # Calculate foot width
-                foot_width = self.calculate_foot_width(landmarks)
-                
-                if not self.in_squat and knee_angle < 140:
-                    self.in_squat = True
-                    self.current_squat = {
-                        'lowest_angle': knee_angle,
-                        'max_depth': depth_percentage,
-                        'foot_width': foot_width,
-                        'form_issues': []
-                    }
-                elif self.in_squat:
-                    self.current_squat['lowest_angle'] = min(self.current_squat['lowest_angle'], knee_angle)
-                    self.current_squat['max_depth'] = max(self.current_squat['max_depth'], depth_percentage)
-                    self.current_squat['foot_width'] = foot_width
-                    
-                    if knee_angle > 160:  # Completed rep
-                        self.in_squat = False
-                        self.squat_count += 1
-                        self.squat_history.append(self.current_squat)
-                        metrics['squat_count'] = self.squat_count
-            
-            # Draw skeleton
-            self.mp_draw.draw_landmarks(
-                frame, results.pose_landmarks, self.mp_pose.POSE_CONNECTIONS)
-            
-            # Draw visual guides including foot width
-            self.draw_guides(frame, landmarks)
+                if frame is not None:
+                    self.draw_depth_lines(frame, hip_height)
             
-        metrics['frame'] = frame
         return metrics
 
+    def draw_depth_lines(self, frame, hip_height):
+        # Draw guide lines
+        h, w, _ = frame.shape
+        
+        # Standing position line (green)
+        y_stand = int(self.initial_hip_height)
+        cv2.line(frame, (0, y_stand), (w, y_stand), (0, 255, 0), 2)
+        
+        # Target depth line (red)
+        y_target = int(self.initial_hip_height + (self.initial_hip_height * self.depth_factor))
+        cv2.line(frame, (0, y_target), (w, y_target), (0, 0, 255), 2)
+        
+        # Current hip position line (blue)
+        y_current = int(hip_height)
+        cv2.line(frame, (0, y_current), (w, y_current), (255, 0, 0), 1)
+
+    def depth_percentage(self, hip_height):
+        current_drop = hip_height - self.initial_hip_height
+        max_drop = self.initial_hip_height * self.depth_factor
+        return min(100, (current_drop / max_drop) * 100)
+
+    def update_reps(self, knee_angle, hip_height, foot_width, timestamp):
+        """Advance the rep state machine by one frame. Returns True when a rep completes.
+
+        Works on plain numbers so recorded traces can be replayed through
+        the exact same logic without landmark objects or frames.
+        """
+        if knee_angle > self.standing_angle:  # Standing position
+            self.initial_hip_height = hip_height
+        
+        if not self.initial_hip_height:
+            return False
+        
+        depth_percentage = self.depth_percentage(hip_height)
+        
+        if not self.in_squat and knee_angle < self.squat_entry_angle:
+            self.in_squat = True
+            self.current_squat = {
+                'lowest_angle': knee_angle,
+                'max_depth': depth_percentage,
+                'foot_width': foot_width,
+                'form_issues': [],
+                'start_time': timestamp,
+                'trajectory': [(knee_angle, depth_percentage)]
+            }
+            self.new_lowest = True
+        elif self.in_squat:
+            if knee_angle < self.current_squat['lowest_angle']:
+                self.current_squat['lowest_angle'] = knee_angle
+                self.new_lowest = True
+            self.current_squat['max_depth'] = max(self.current_squat['max_depth'], depth_percentage)
+            self.current_squat['foot_width'] = foot_width
+            self.current_squat['trajectory'].append((knee_angle, depth_percentage))
+            
+            if knee_angle > self.standing_angle:  # Completed rep
+                self.in_squat = False
+                self.current_squat['end_time'] = timestamp
+                if self.rep_matcher is not None:
+                    self.current_squat.update(self.rep_matcher.compare(self.current_squat))
+                self.squat_count += 1
+                self.squat_history.append(self.current_squat)
+                return True
+        return False
+
     def draw_guides(self, frame, landmarks):
         if self.initial_hip_height:
             h, w, _ = frame.shape
@@ -167,7 +359,7 @@ class PoseDetector:
             cv2.line(frame, (0, y_stand), (w, y_stand), (0, 255, 0), 2)
             
             # Draw target depth line
-            y_target = int(self.initial_hip_height + (self.initial_hip_height * 0.4))
+            y_target = int(self.initial_hip_height + (self.initial_hip_height * self.depth_factor))
             cv2.line(frame, (0, y_target), (w, y_target), (0, 0, 255), 2)
             
             # Draw foot width guide
@@ -0,0 +1,130 @@
+import time
+
+# Quality levels from best to cheapest. input_width None means the pose model
+# sees the full camera frame; stride N runs inference on every Nth frame.
+DEFAULT_LEVELS = [
+    {'input_width': None, 'model_complexity': 1, 'stride': 1},
+    {'input_width': 960, 'model_complexity': 1, 'stride': 1},
+    {'input_width': 640, 'model_complexity': 1, 'stride': 1},
+    {'input_width': 640, 'model_complexity': 0, 'stride': 1},
+    {'input_width': 480, 'model_complexity': 0, 'stride': 1},
+    {'input_width': 480, 'model_complexity': 0, 'stride': 2},
+    {'input_width': 480, 'model_complexity': 0, 'stride': 3},
+]
+
+class AdaptiveQualityController:
+    """Trades pose quality for frame rate to hold a target FPS.
+
+    Loop and inference latency are averaged over windows of frames. The
+    controller steps down one level after degrade_windows consecutive slow
+    windows in which inference is a real share of the loop (cheaper
+    inference would not help otherwise). It steps back up only after
+    upgrade_windows consecutive windows with clear headroom, and never
+    within cooldown seconds of the last change, so it does not flap
+    around the threshold. A level that proved too slow is not retried
+    until its backoff expires; the backoff doubles each time it fails.
+    """
+
+    def __init__(self, target_fps=25, levels=None, window=30,
+                 degrade_margin=0.9, upgrade_margin=1.3,
+                 degrade_windows=2, upgrade_windows=5, cooldown=3.0,
+                 min_inference_share=0.3, retry_backoff=30.0, max_backoff=600.0):
+        self.target_fps = target_fps
+        self.levels = levels or DEFAULT_LEVELS
+        self.window = window
+        self.degrade_margin = degrade_margin
+        self.upgrade_margin = upgrade_margin
+        self.degrade_windows = degrade_windows
+        self.upgrade_windows = upgrade_windows
+        self.cooldown = cooldown
+        self.min_inference_share = min_inference_share
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.backoff = {}  # level -> (failed_at, seconds before retrying it)
+
+        self.level = 0
+        self.adjustments = []
+        self.last_change = time.monotonic()
+        self.slow_windows = 0
+        self.fast_windows = 0
+        self._reset_window()
+
+    def _reset_window(self):
+        self.frames = 0
+        self.loop_total = 0.0
+        self.inference_total = 0.0
+
+    @property
+    def settings(self):
+        return self.levels[self.level]
+
+    def should_infer(self, frame_index):
+        return frame_index % self.settings['stride'] == 0
+
+    def apply(self, pose_detector):
+        """Push the current level's settings into a PoseDetector."""
+        pose_detector.input_width = self.settings['input_width']
+        pose_detector.set_model_complexity(self.settings['model_complexity'])
+
+    def apply_stream(self, inference_stream):
+        """Push the current level's model settings to an InferenceClient's worker."""
+        inference_stream.set_quality(self.settings['model_complexity'], self.settings['input_width'])
+
+    def frame_done(self, loop_seconds, inference_seconds):
+        """Record one loop iteration. Returns True if the level changed.
+
+        Pass inference_seconds=None for frames that are not being analyzed
+        (e.g. not recording); they do not count toward any window.
+        """
+        if inference_seconds is None:
+            return False
+        self.frames += 1
+        self.loop_total += loop_seconds
+        self.inference_total += inference_seconds
+        if self.frames < self.window:
+            return False
+
+        fps = self.frames / self.loop_total if self.loop_total > 0 else float('inf')
+        inference_share = self.inference_total / self.loop_total if self.loop_total > 0 else 0
+        inference_ms = self.inference_total / self.frames * 1000
+        self._reset_window()
+
+        if fps < self.target_fps * self.degrade_margin and inference_share >= self.min_inference_share:
+            self.slow_windows += 1
+            self.fast_windows = 0
+        elif fps > self.target_fps * self.upgrade_margin:
+            self.fast_windows += 1
+            self.slow_windows = 0
+        else:
+            self.slow_windows = 0
+            self.fast_windows = 0
+
+        if time.monotonic() - self.last_change < self.cooldown:
+            return False
+        if self.slow_windows >= self.degrade_windows and self.level < len(self.levels) - 1:
+            return self._change(self.level + 1, fps, inference_ms)
+        if self.fast_windows >= self.upgrade_windows and self.level > 0:
+            failed_at, wait = self.backoff.get(self.level - 1, (0.0, 0.0))
+            if time.monotonic() - failed_at >= wait:
+                return self._change(self.level - 1, fps, inference_ms)
+        return False
+
+    def _change(self, level, fps, inference_ms):
+        direction = "down" if level > self.level else "up"
+        if level > self.level:
+            _, wait = self.backoff.get(self.level, (0.0, self.retry_backoff / 2))
+            self.backoff[self.level] = (time.monotonic(), min(self.max_backoff, wait * 2))
+        self.level = level
+        self.last_change = time.monotonic()
+        self.slow_windows = 0
+        self.fast_windows = 0
+        settings = self.settings
+        self.adjustments.append({'time': time.time(), 'level': level, 'fps': fps,
+                                 'inference_ms': inference_ms, **settings})
+        print(f"Quality {direction} to level {level}: "
+              f"input_width={settings['input_width'] or 'full'}, "
+              f"model_complexity={settings['model_complexity']}, "
+              f"stride={settings['stride']} "
+              f"(measured {fps:.1f} FPS, inference {inference_ms:.1f} ms, "
+              f"target {self.target_fps} FPS)")
+        return True
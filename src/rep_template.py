@@ -0,0 +1,226 @@
+import argparse
+import json
+import math
+
+import numpy as np
+
+# Trajectories are resampled to a fixed length and scaled so knee angle
+# (degrees / 180) and depth (percent / 100) weigh the same
+DEFAULT_LENGTH = 64
+DEFAULT_BAND = 0.1  # Sakoe-Chiba band as a fraction of the length
+SCALE = np.array([180.0, 100.0])
+
+
+def normalize_trajectory(trajectory, length=DEFAULT_LENGTH):
+    """Resample a [(knee_angle, depth_percentage), ...] rep to (length, 2)."""
+    points = np.asarray(trajectory, dtype=np.float64).reshape(-1, 2) / SCALE
+    if len(points) == 1:
+        return np.repeat(points, length, axis=0)
+    source = np.linspace(0.0, 1.0, len(points))
+    target = np.linspace(0.0, 1.0, length)
+    return np.column_stack([np.interp(target, source, points[:, i]) for i in range(2)])
+
+
+def rep_duration(rep):
+    if rep.get('start_time') is None or rep.get('end_time') is None:
+        return None
+    return rep['end_time'] - rep['start_time']
+
+
+def banded_dtw(query, reference, window, best_so_far=math.inf):
+    """Squared-Euclidean DTW restricted to |i - j| <= window.
+
+    Abandons and returns inf as soon as every cell of a row exceeds
+    best_so_far, since the final distance can only be larger.
+    """
+    n = len(query)
+    m = len(reference)
+    query = query.tolist()
+    reference = reference.tolist()
+    previous = [math.inf] * (m + 1)
+    previous[0] = 0.0
+    for i in range(1, n + 1):
+        current = [math.inf] * (m + 1)
+        qa, qd = query[i - 1]
+        row_min = math.inf
+        for j in range(max(1, i - window), min(m, i + window) + 1):
+            ra, rd = reference[j - 1]
+            cost = (qa - ra) ** 2 + (qd - rd) ** 2
+            best = previous[j - 1]
+            if previous[j] < best:
+                best = previous[j]
+            if current[j - 1] < best:
+                best = current[j - 1]
+            current[j] = cost + best
+            if current[j] < row_min:
+                row_min = current[j]
+        if row_min > best_so_far:
+            return math.inf
+        previous = current
+    return previous[m]
+
+
+class RepTemplate:
+    """A coach-recorded reference rep and its LB_Keogh envelope."""
+
+    def __init__(self, trajectory, duration=None, name='reference',
+                 length=DEFAULT_LENGTH, band=DEFAULT_BAND):
+        self.name = name
+        self.trajectory = [tuple(float(v) for v in point) for point in trajectory]
+        self.duration = duration
+        self.length = length
+        self.window = max(1, int(round(band * length)))
+        self.series = normalize_trajectory(self.trajectory, length)
+
+        # Envelope: running max/min of the template over the band
+        padded = np.pad(self.series, ((self.window, self.window), (0, 0)), mode='edge')
+        windows = np.lib.stride_tricks.sliding_window_view(
+            padded, 2 * self.window + 1, axis=0)
+        self.upper = windows.max(axis=2)
+        self.lower = windows.min(axis=2)
+
+    @classmethod
+    def from_rep(cls, rep, name='reference', **options):
+        return cls(rep['trajectory'], rep_duration(rep), name, **options)
+
+    @classmethod
+    def load(cls, path, **options):
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data['trajectory'], data.get('duration'), data.get('name', path), **options)
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'name': self.name, 'duration': self.duration,
+                       'trajectory': self.trajectory}, f)
+
+    def lower_bounds(self, series):
+        """LB_Keogh for one (length, 2) series or a (reps, length, 2) stack."""
+        above = np.clip(series - self.upper, 0, None)
+        below = np.clip(self.lower - series, 0, None)
+        return (above ** 2 + below ** 2).sum(axis=(-2, -1))
+
+    def distance(self, series, best_so_far=math.inf):
+        return banded_dtw(series, self.series, self.window, best_so_far)
+
+
+class RepTemplateMatcher:
+    """Compares completed reps against one or more reference templates.
+
+    Templates are tried in order of their lower bound, and a template
+    whose bound already exceeds the best distance found is skipped, so
+    most comparisons never run the full DTW.
+    """
+
+    def __init__(self, templates):
+        if not templates:
+            raise ValueError("At least one template is required")
+        lengths = {template.length for template in templates}
+        if len(lengths) != 1:
+            raise ValueError("Templates must share the same resample length")
+        self.templates = list(templates)
+        self.length = lengths.pop()
+
+    def similarity(self, distance):
+        # Root-mean-square deviation per point in normalized units: 0.05 is
+        # about 9 degrees or 5% depth off the reference on average
+        if not math.isfinite(distance):
+            return 0.0
+        rms = math.sqrt(distance / self.length)
+        return max(0.0, 100.0 - rms * 400.0)
+
+    def _best(self, series, bounds, duration):
+        best_distance = math.inf
+        best_template = None
+        for index in np.argsort(bounds):
+            if bounds[index] >= best_distance:
+                break
+            template = self.templates[index]
+            distance = template.distance(series, best_distance)
+            if distance < best_distance:
+                best_distance = distance
+                best_template = template
+        if best_template is None:
+            # Only possible with non-finite input (e.g. NaN angles)
+            best_template = self.templates[int(np.argmin(bounds))]
+
+        tempo_ratio = None
+        if duration and best_template.duration:
+            tempo_ratio = duration / best_template.duration
+        return {
+            'template': best_template.name,
+            'template_distance': best_distance,
+            'template_similarity': self.similarity(best_distance),
+            'tempo_ratio': tempo_ratio
+        }
+
+    def compare(self, rep):
+        """Best-matching template for one rep with a 'trajectory'."""
+        series = normalize_trajectory(rep['trajectory'], self.length)
+        bounds = np.array([template.lower_bounds(series) for template in self.templates])
+        return self._best(series, bounds, rep_duration(rep))
+
+    def score_batch(self, reps):
+        """compare() for many reps, with all lower bounds computed in one pass.
+
+        Reps without a recorded trajectory get None.
+        """
+        results = [None] * len(reps)
+        indices = [i for i, rep in enumerate(reps) if rep.get('trajectory')]
+        if not indices:
+            return results
+        stack = np.stack([normalize_trajectory(reps[i]['trajectory'], self.length)
+                          for i in indices])
+        bounds = np.stack([template.lower_bounds(stack) for template in self.templates], axis=1)
+        for i, series, rep_bounds in zip(indices, stack, bounds):
+            results[i] = self._best(series, rep_bounds, rep_duration(reps[i]))
+        return results
+
+
+def load_matcher(paths):
+    """RepTemplateMatcher over the template files at paths, or None if there are none."""
+    if not paths:
+        return None
+    return RepTemplateMatcher([RepTemplate.load(path) for path in paths])
+
+
+def load_reps(path):
+    """Reps from a job server result ({'reps': [...]}) or a plain list."""
+    with open(path) as f:
+        data = json.load(f)
+    return data['reps'] if isinstance(data, dict) else data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare reps against reference rep templates")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    make = commands.add_parser('make', help="save one rep of a session as a template")
+    make.add_argument('reps', help="session JSON with recorded reps")
+    make.add_argument('output')
+    make.add_argument('--rep', type=int, default=0, help="rep index (0-based)")
+    make.add_argument('--name', default=None)
+
+    score = commands.add_parser('score', help="score stored reps against templates")
+    score.add_argument('reps', nargs='+', help="session JSON files")
+    score.add_argument('--template', action='append', required=True)
+    args = parser.parse_args()
+
+    if args.command == 'make':
+        rep = load_reps(args.reps)[args.rep]
+        RepTemplate.from_rep(rep, args.name or f"{args.reps}#{args.rep}").save(args.output)
+        print(f"Saved template with {len(rep['trajectory'])} frames to {args.output}")
+        return
+
+    matcher = load_matcher(args.template)
+    for path in args.reps:
+        for i, result in enumerate(matcher.score_batch(load_reps(path))):
+            if result is None:
+                continue
+            tempo = f"{result['tempo_ratio']:.2f}x" if result['tempo_ratio'] else "n/a"
+            print(f"{path} rep {i + 1}: {result['template']} "
+                  f"similarity {result['template_similarity']:.0f}% tempo {tempo}")
+
+
+if __name__ == "__main__":
+    main()
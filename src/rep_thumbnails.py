@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from frame_pool import FramePool
+
+class RepThumbnailStore:
+    """Keeps a small JPEG of each rep's lowest point with bounded memory.
+
+    capture() only downscales the candidate frame into a reused buffer,
+    which is cheap enough to run on every new lowest angle in the live
+    loop. JPEG encoding happens on a background thread when the rep is
+    committed. Once the in-memory thumbnails exceed max_memory_bytes the
+    oldest spill to disk, and past max_disk_files the oldest are deleted.
+    """
+
+    def __init__(self, width=160, max_memory_bytes=2 * 1024 * 1024,
+                 spill_dir=None, max_disk_files=2000, jpeg_quality=75):
+        self.width = width
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_files = max_disk_files
+        self.encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), jpeg_quality]
+        self.spill_dir = spill_dir
+        self.owns_spill_dir = spill_dir is None
+
+        self.frame_pool = FramePool()
+        self.candidate = None
+        self.committed = 0
+        self.memory = OrderedDict()   # rep index -> JPEG bytes
+        self.memory_bytes = 0
+        self.on_disk = OrderedDict()  # rep index -> file path
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def capture(self, frame):
+        """Remember frame as the current rep's lowest-point candidate."""
+        height, width = frame.shape[:2]
+        size = (self.width, max(1, int(height * self.width / width)))
+        self.candidate = self.frame_pool.resize('candidate', frame, size,
+                                                interpolation=cv2.INTER_AREA)
+
+    def commit(self, rep_index):
+        """Store the current candidate as rep_index's thumbnail."""
+        self.committed = rep_index + 1
+        if self.candidate is None:
+            return
+        image = self.candidate.copy()
+        self.candidate = None
+        self.executor.submit(self._encode, rep_index, image)
+
+    def _encode(self, rep_index, image):
+        ok, jpeg = cv2.imencode('.jpg', image, self.encode_params)
+        if not ok:
+            return
+        with self.lock:
+            self.memory[rep_index] = jpeg.tobytes()
+            self.memory_bytes += len(self.memory[rep_index])
+            self._evict()
+
+    def _evict(self):
+        while self.memory_bytes > self.max_memory_bytes and len(self.memory) > 1:
+            rep_index, data = self.memory.popitem(last=False)
+            self.memory_bytes -= len(data)
+            self._spill(rep_index, data)
+        while len(self.on_disk) > self.max_disk_files:
+            _, path = self.on_disk.popitem(last=False)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _spill(self, rep_index, data):
+        if self.max_disk_files <= 0:
+            return
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix='rep_thumbnails_')
+        path = os.path.join(self.spill_dir, f"rep_{rep_index:06d}.jpg")
+        with open(path, 'wb') as f:
+            f.write(data)
+        self.on_disk[rep_index] = path
+
+    def get(self, rep_index):
+        """Decoded BGR thumbnail for a rep, or None if it was never kept or evicted."""
+        with self.lock:
+            data = self.memory.get(rep_index)
+            path = self.on_disk.get(rep_index)
+        if data is None and path is not None:
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                return None
+        if data is None:
+            return None
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    def flush(self):
+        """Wait for pending encodes, e.g. before showing the summary."""
+        self.executor.submit(lambda: None).result()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        if self.owns_spill_dir and self.spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
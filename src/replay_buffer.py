@@ -0,0 +1,107 @@
+import cv2
+import numpy as np
+from collections import deque
+
+class ReplayBuffer:
+    """Bounded ring buffer of recent frames for instant replay.
+
+    Frames are kept as downscaled JPEGs next to the landmarks and metrics
+    computed for them, so replaying never re-decodes the source or re-runs
+    pose inference. Memory is capped by both duration and total bytes.
+    """
+
+    def __init__(self, max_seconds=60, max_bytes=64 * 1024 * 1024,
+                 max_width=640, jpeg_quality=80):
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.max_width = max_width
+        self.encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), jpeg_quality]
+        self.entries = deque()
+        self.total_bytes = 0
+        # Reps before this index in squat_history predate the last clear()
+        self.first_rep = 0
+
+    def push(self, frame, metrics, timestamp):
+        # Downscale before encoding to keep each entry small
+        height, width = frame.shape[:2]
+        if width > self.max_width:
+            new_height = int(height * (self.max_width / width))
+            frame = cv2.resize(frame, (self.max_width, new_height),
+                               interpolation=cv2.INTER_AREA)
+
+        ok, jpeg = cv2.imencode('.jpg', frame, self.encode_params)
+        if not ok:
+            return
+
+        landmarks = metrics.get('landmarks')
+        entry = {
+            'timestamp': timestamp,
+            'jpeg': jpeg.tobytes(),
+            'landmarks': None if landmarks is None else landmarks.copy(),
+            'metrics': {
+                key: value for key, value in metrics.items()
+                if key not in ('frame', 'landmarks')
+            }
+        }
+        entry['size'] = len(entry['jpeg'])
+        if entry['landmarks'] is not None:
+            entry['size'] += entry['landmarks'].nbytes
+
+        self.entries.append(entry)
+        self.total_bytes += entry['size']
+        self._evict(timestamp)
+
+    def _evict(self, now):
+        while self.entries and (
+                self.total_bytes > self.max_bytes or
+                now - self.entries[0]['timestamp'] > self.max_seconds):
+            self.total_bytes -= self.entries.popleft()['size']
+
+    def clear(self, first_rep=0):
+        """Drop every frame. Pass len(squat_history) when the timestamps restart
+        (e.g. a video loops) so reps recorded before are never matched again.
+        """
+        self.entries.clear()
+        self.total_bytes = 0
+        self.first_rep = first_rep
+
+    def decode(self, entry):
+        return cv2.imdecode(np.frombuffer(entry['jpeg'], dtype=np.uint8),
+                            cv2.IMREAD_COLOR)
+
+    @property
+    def start_time(self):
+        return self.entries[0]['timestamp'] if self.entries else None
+
+    @property
+    def end_time(self):
+        return self.entries[-1]['timestamp'] if self.entries else None
+
+    def rep_jump_points(self, squat_history):
+        """Return (rep_index, start_time) for every rep still held in the buffer."""
+        start, end = self.start_time, self.end_time
+        if start is None:
+            return []
+        return [
+            (i, rep['start_time'])
+            for i, rep in enumerate(squat_history)
+            if i >= self.first_rep and rep.get('start_time') is not None
+            and start <= rep['start_time'] <= end
+            and rep.get('end_time', rep['start_time']) <= end
+        ]
+
+    def replay(self, start_time=None, speed=0.25):
+        """Yield (frame, entry, wait_seconds) from start_time onward.
+
+        wait_seconds is the gap to the previous frame scaled by 1/speed, so
+        speed=0.25 plays back at quarter speed.
+        """
+        previous = None
+        for entry in list(self.entries):
+            if start_time is not None and entry['timestamp'] < start_time:
+                continue
+            wait = 0.0
+            if previous is not None:
+                wait = max(0.0, entry['timestamp'] - previous) / speed
+            previous = entry['timestamp']
+            yield self.decode(entry), entry, wait
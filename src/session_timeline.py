@@ -0,0 +1,97 @@
+import numpy as np
+
+# Bucket columns: first and last timestamp, then min/max of each series
+START, END, MIN_ANGLE, MAX_ANGLE, MIN_DEPTH, MAX_DEPTH = range(6)
+# Bucket mark bits
+REP_STARTED = 1
+REP_COMPLETED = 2
+
+
+class _Level:
+    """Growable (n, 6) bucket array plus mark bits for one pyramid level."""
+
+    def __init__(self, capacity=1024):
+        self.data = np.empty((capacity, 6))
+        self.marks = np.zeros(capacity, dtype=np.uint8)
+        self.size = 0
+
+    def append(self, row, marks):
+        if self.size == len(self.data):
+            self.data = np.concatenate([self.data, np.empty_like(self.data)])
+            self.marks = np.concatenate([self.marks, np.zeros_like(self.marks)])
+        self.data[self.size] = row
+        self.marks[self.size] = marks
+        self.size += 1
+
+
+class SessionTimeline:
+    """Knee angle and depth percentage for a whole session as a min/max pyramid.
+
+    Level 0 holds every sample; each level above merges pairs of buckets
+    from the level below, keeping the time span, the min and max of both
+    series and whether a rep started or completed inside. Appending is
+    amortized O(1). buckets() returns the finest level that fits in a
+    given number of buckets, so drawing costs the same for a minute or an
+    hour of samples, and min/max buckets keep the bottom of every rep
+    visible however far it is zoomed out.
+    """
+
+    def __init__(self):
+        self.levels = [_Level()]
+
+    def __len__(self):
+        return self.levels[0].size
+
+    def clear(self):
+        self.levels = [_Level()]
+
+    def append(self, timestamp, knee_angle, depth_percentage, rep_started=False, rep_completed=False):
+        marks = (REP_STARTED if rep_started else 0) | (REP_COMPLETED if rep_completed else 0)
+        self.levels[0].append(
+            (timestamp, timestamp, knee_angle, knee_angle, depth_percentage, depth_percentage), marks)
+
+        # Carry completed pairs upwards, like incrementing a binary counter
+        index = 0
+        while self.levels[index].size % 2 == 0:
+            level = self.levels[index]
+            first, second = level.data[level.size - 2], level.data[level.size - 1]
+            merged = (first[START], second[END],
+                      min(first[MIN_ANGLE], second[MIN_ANGLE]), max(first[MAX_ANGLE], second[MAX_ANGLE]),
+                      min(first[MIN_DEPTH], second[MIN_DEPTH]), max(first[MAX_DEPTH], second[MAX_DEPTH]))
+            if index + 1 == len(self.levels):
+                self.levels.append(_Level())
+            self.levels[index + 1].append(merged, level.marks[level.size - 2] | level.marks[level.size - 1])
+            index += 1
+
+    def buckets(self, max_buckets):
+        """(rows, marks) covering the whole session in at most about max_buckets buckets.
+
+        rows is (n, 6) with the START..MAX_DEPTH columns. Samples not yet
+        merged into a full bucket at the chosen level are appended from
+        the finer levels, which adds at most one bucket per level.
+        """
+        if not len(self):
+            return np.empty((0, 6)), np.empty(0, dtype=np.uint8)
+        index = 0
+        while self.levels[index].size > max_buckets and index + 1 < len(self.levels):
+            index += 1
+
+        level = self.levels[index]
+        rows = [level.data[:level.size]]
+        marks = [level.marks[:level.size]]
+        covered = level.size
+        for lower in reversed(self.levels[:index]):
+            covered *= 2
+            rows.append(lower.data[covered:lower.size])
+            marks.append(lower.marks[covered:lower.size])
+            covered = lower.size
+        return np.concatenate(rows), np.concatenate(marks)
+
+    @property
+    def start_time(self):
+        return self.levels[0].data[0, START] if len(self) else None
+
+    @property
+    def end_time(self):
+        level = self.levels[0]
+        return level.data[level.size - 1, END] if level.size else None
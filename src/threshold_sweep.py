@@ -0,0 +1,183 @@
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import mediapipe as mp
+import numpy as np
+
+from landmark_trace import load_trace
+from pose_detector import PoseDetector
+
+_library = None  # per-worker features, filled by _init_worker
+_max_reps = None
+
+
+def trace_features(trace):
+    """Per-frame knee angle, hip height and foot width, computed once per trace.
+
+    These only depend on the landmarks, never on the thresholds, so every
+    parameter set replays the same plain-number sequences.
+    """
+    landmark = mp.solutions.pose.PoseLandmark
+    landmarks = trace['landmarks']
+    valid = ~np.isnan(landmarks[:, 0, 0])
+    points = landmarks[valid].astype(np.float64)
+
+    hip = points[:, landmark.LEFT_HIP, :2]
+    knee = points[:, landmark.LEFT_KNEE, :2]
+    ankle = points[:, landmark.LEFT_ANKLE, :2]
+    ba = hip - knee
+    bc = ankle - knee
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cosine_angle = np.sum(ba * bc, axis=1) / (np.linalg.norm(ba, axis=1) *
+                                                  np.linalg.norm(bc, axis=1))
+        knee_angle = np.degrees(np.arccos(cosine_angle))
+
+    hip_height = hip[:, 1] * trace['frame_height']
+    foot_width = np.abs(points[:, landmark.LEFT_ANKLE, 0] -
+                        points[:, landmark.RIGHT_ANKLE, 0]) * 100
+    return (knee_angle.tolist(), hip_height.tolist(), foot_width.tolist(),
+            trace['timestamps'][valid].tolist())
+
+
+def load_library(library_dir):
+    """Load labeled traces from library_dir/labels.json.
+
+    Labels map a trace file name to a rep count, or to
+    {"reps": n, "good_reps": m} to also score the depth quality cut.
+    """
+    with open(os.path.join(library_dir, 'labels.json')) as f:
+        labels = json.load(f)
+
+    library = []
+    for name, label in sorted(labels.items()):
+        if not isinstance(label, dict):
+            label = {'reps': label}
+        path = os.path.join(library_dir, name)
+        if not path.endswith('.npz'):
+            path += '.npz'
+        library.append((name, label, trace_features(load_trace(path))))
+    return library
+
+
+def replay(features, params, max_reps=None):
+    """Count (reps, good_reps) for one trace under one parameter set.
+
+    Every rep is counted by default; the 10-rep cap is for the live
+    session. Pass max_reps to score against what the app would report.
+    """
+    pose_detector = PoseDetector(params['squat_entry_angle'],
+                                 params['standing_angle'],
+                                 params['depth_factor'],
+                                 max_reps=max_reps)
+    for knee_angle, hip_height, foot_width, timestamp in zip(*features):
+        if pose_detector.reached_max_reps():
+            break
+        pose_detector.update_reps(knee_angle, hip_height, foot_width, timestamp)
+    good_reps = sum(1 for rep in pose_detector.squat_history
+                    if rep['max_depth'] >= params['good_depth'])
+    return pose_detector.squat_count, good_reps
+
+
+def score(params, library, max_reps=None):
+    rep_error = 0
+    good_error = 0
+    exact = 0
+    for _, label, features in library:
+        reps, good_reps = replay(features, params, max_reps)
+        rep_error += abs(reps - label['reps'])
+        if 'good_reps' in label:
+            good_error += abs(good_reps - label['good_reps'])
+        exact += reps == label['reps']
+    return {
+        'params': params,
+        'rep_error': rep_error,
+        'good_rep_error': good_error,
+        'exact': exact,
+        'traces': len(library)
+    }
+
+
+def _init_worker(library_dir, max_reps):
+    global _library, _max_reps
+    _library = load_library(library_dir)
+    _max_reps = max_reps
+
+
+def _score_in_worker(params):
+    return score(params, _library, _max_reps)
+
+
+def parameter_grid(grid):
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def sweep(library_dir, grid, workers=None, max_reps=None):
+    """Score every parameter set in grid, best first.
+
+    Each worker process loads and featurizes the library once, then
+    replays it through the rep logic for its share of the grid.
+    """
+    param_sets = list(parameter_grid(grid))
+    workers = workers or os.cpu_count()
+    chunksize = max(1, len(param_sets) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(library_dir, max_reps)) as pool:
+        results = list(pool.map(_score_in_worker, param_sets, chunksize=chunksize))
+    results.sort(key=lambda r: (r['rep_error'] + r['good_rep_error'], -r['exact']))
+    return results
+
+
+def parse_values(text, cast=float):
+    """Parse "130,140,150" or a "start:stop:step" range (stop inclusive)."""
+    if ':' in text:
+        start, stop, step = (float(v) for v in text.split(':'))
+        return [cast(round(v, 6)) for v in np.arange(start, stop + step / 2, step)]
+    return [cast(v) for v in text.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep rep-detection thresholds over labeled traces")
+    parser.add_argument('library', help="directory with .npz traces and labels.json")
+    # Defaults match PoseDetector and the "Too Shallow" cut in GUI.assess_squat_quality
+    parser.add_argument('--entry', default='140', help="squat entry angles, e.g. 130:150:2")
+    parser.add_argument('--standing', default='160', help="standing angles")
+    parser.add_argument('--depth-factor', default='0.4', help="depth factors")
+    parser.add_argument('--good-depth', default='60', help="depth %% counted as a good rep")
+    parser.add_argument('--max-reps', type=int, default=None,
+                        help="stop counting at this many reps, like the live session's cap")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--output', help="write all results as JSON")
+    args = parser.parse_args()
+
+    grid = {
+        'squat_entry_angle': parse_values(args.entry),
+        'standing_angle': parse_values(args.standing),
+        'depth_factor': parse_values(args.depth_factor),
+        'good_depth': parse_values(args.good_depth)
+    }
+    results = sweep(args.library, grid, args.workers, args.max_reps)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    print(f"Scored {len(results)} parameter sets")
+    for result in results[:args.top]:
+        params = result['params']
+        print(f"entry={params['squat_entry_angle']:.1f} "
+              f"standing={params['standing_angle']:.1f} "
+              f"depth_factor={params['depth_factor']:.3f} "
+              f"good_depth={params['good_depth']:.0f}  "
+              f"rep_error={result['rep_error']} "
+              f"good_rep_error={result['good_rep_error']} "
+              f"exact={result['exact']}/{result['traces']}")
+
+
+if __name__ == "__main__":
+    main()
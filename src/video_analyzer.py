@@ -1,45 +1,49 @@
 import cv2
-import yt_dlp
-import os
 from pose_detector import PoseDetector
 from gui import GUI
+from replay_buffer import ReplayBuffer
+from playback import PlaybackScheduler
+from capture import open_capture
+from video_cache import VideoCache
+from rep_template import load_matcher
 import pygame
 
 class VideoAnalyzer:
-    def __init__(self):
+    def __init__(self, template_paths=()):
         self.pose_detector = PoseDetector()
+        # Score each rep against coach reference reps, if any are given
+        self.pose_detector.rep_matcher = load_matcher(template_paths)
         self.gui = GUI()
+        self.replay_buffer = ReplayBuffer()
+        # Downloads are kept between runs and shared by concurrent analyses
+        self.video_cache = VideoCache()
         
     def download_youtube_video(self, url):
         try:
-            print("Downloading video...")
-            
-            ydl_opts = {
-                'format': 'mp4',
-                'outtmpl': 'temp_squat.mp4',
-                'quiet': True
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+            path = self.video_cache.lookup(url)
+            if path:
+                print("Using cached video")
+                return path
             
+            print("Downloading video...")
+            path = self.video_cache.fetch(url)
             print("Download complete!")
-            return 'temp_squat.mp4'
+            return path
             
         except Exception as e:
             print(f"Error downloading video: {e}")
             return None
 
-    def analyze_video(self, video_path):
+    def analyze_video(self, video_path, max_speed=False):
         try:
-            cap = cv2.VideoCapture(video_path)
+            # Every frame of the video, even from a URL; skipping is the scheduler's call
+            cap = open_capture(video_path, grab_latest=False)
             if not cap.isOpened():
                 print("Error: Could not open video")
                 return
 
-            # Get video properties
-            fps = int(cap.get(cv2.CAP_PROP_FPS))
-            delay = int(1000/fps)
+            # Pace playback by frame timestamps; max_speed analyzes as fast as possible
+            scheduler = PlaybackScheduler(cap.get(cv2.CAP_PROP_FPS), max_speed=max_speed)
 
             running = True
             paused = False
@@ -53,38 +57,97 @@ class VideoAnalyzer:
                             running = False
                         elif event.key == pygame.K_SPACE:
                             paused = not paused
+                            scheduler.reset()
+                            cap.reset_clock()
+                        elif event.key == pygame.K_r:
+                            running = self.replay()
+                            scheduler.reset()
+                            cap.reset_clock()
 
-                if not paused:
-                    ret, frame = cap.read()
-                    if not ret:
-                        # Loop back to start of video
-                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                        continue
+                if paused:
+                    pygame.time.wait(10)
+                    continue
 
-                    # Resize frame if too large
-                    height, width = frame.shape[:2]
-                    if width > 1280:
-                        new_width = 1280
-                        new_height = int(height * (new_width / width))
-                        frame = cv2.resize(frame, (new_width, new_height))
+                # Drop frames we are already too late to show without decoding them
+                skip = scheduler.frames_behind()
+                for _ in range(skip):
+                    if not cap.grab():
+                        break
+                scheduler.skipped(skip)
 
-                    # Analyze frame
-                    knee_angle, depth_percentage, proper_form, annotated_frame = \
-                        self.pose_detector.detect_pose(frame)
+                ret, frame = cap.read()
+                if not ret:
+                    # Loop back to start of video
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    self.replay_buffer.clear(len(self.pose_detector.squat_history))
+                    scheduler.rewind()
+                    continue
 
-                    # Update display
-                    self.gui.update_display(annotated_frame, knee_angle, depth_percentage, proper_form)
+                # Resize frame if too large
+                height, width = frame.shape[:2]
+                if width > 1280:
+                    new_width = 1280
+                    new_height = int(height * (new_width / width))
+                    frame = cv2.resize(frame, (new_width, new_height))
 
-                pygame.time.wait(delay)
+                # Analyze frame on the video's own clock
+                timestamp = scheduler.frame_time(cap)
+                metrics = self.pose_detector.detect_pose(frame, timestamp)
+                self.replay_buffer.push(metrics['frame'], metrics, timestamp)
+
+                # Hold the frame until its presentation time, then show it
+                scheduler.wait(timestamp)
+                self.gui.update_display(metrics['frame'], metrics)
 
             cap.release()
 
         except Exception as e:
             print(f"Error analyzing video: {e}")
-        finally:
-            # Cleanup
-            if os.path.exists('temp_squat.mp4'):
-                try:
-                    os.remove('temp_squat.mp4')
-                except:
-                    pass 
\ No newline at end of file
+
+    def replay(self, speed=0.25):
+        """Slow-motion replay of buffered frames, starting at the latest rep.
+
+        LEFT/RIGHT jump between reps, R or ESC returns to live analysis.
+        Returns False if the user asked to quit.
+        """
+        jump_points = self.replay_buffer.rep_jump_points(self.pose_detector.squat_history)
+        if not jump_points and self.replay_buffer.start_time is None:
+            return True
+
+        # Start at the most recent rep, or the last 5 seconds if none are buffered
+        if jump_points:
+            current = len(jump_points) - 1
+            start_time = jump_points[current][1]
+        else:
+            current = None
+            start_time = max(self.replay_buffer.start_time,
+                             self.replay_buffer.end_time - 5)
+
+        while True:
+            jump = None
+            for frame, entry, wait in self.replay_buffer.replay(start_time, speed):
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        return False
+                    elif event.type == pygame.KEYDOWN:
+                        if event.key in (pygame.K_r, pygame.K_ESCAPE):
+                            return True
+                        elif event.key == pygame.K_q:
+                            return False
+                        elif event.key == pygame.K_LEFT and jump_points:
+                            jump = -1
+                        elif event.key == pygame.K_RIGHT and jump_points:
+                            jump = 1
+                if jump is not None:
+                    break
+
+                pygame.time.wait(int(wait * 1000))
+                self.gui.update_display(frame, entry['metrics'])
+
+            if jump is None:
+                # Reached the end of the buffer, go back to live analysis
+                return True
+
+            current = 0 if current is None else current
+            current = max(0, min(len(jump_points) - 1, current + jump))
+            start_time = jump_points[current][1]
@@ -0,0 +1,223 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+YOUTUBE_HOSTS = ('youtube.com', 'youtu.be')
+CHUNK_SIZE = 1024 * 1024
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock on a lock file, across both threads and processes.
+
+    The OS drops the lock if the holder dies, so a crashed download never
+    leaves a stale lock behind.
+    """
+    with open(path, 'a+b') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK gives up after 10 seconds; keep waiting
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def url_key(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_youtube(url):
+    host = (urllib.parse.urlparse(url).hostname or '').lower()
+    return any(host == name or host.endswith('.' + name) for name in YOUTUBE_HOSTS)
+
+
+class VideoCache:
+    """Downloaded videos stored by content hash with an LRU size limit.
+
+    Layout under cache_dir:
+        objects/<sha256>.mp4  one file per distinct video
+        urls/<sha256(url)>.json  which object a URL resolved to
+        locks/  per-URL lock files and the index lock
+        tmp/  in-progress downloads
+
+    A download goes to tmp/ and is moved into objects/ with os.replace, so
+    readers never see a partial file. A per-URL lock makes concurrent
+    fetches of the same URL (threads or processes) download it once. The
+    index lock serializes moving files in and evicting the least recently
+    used objects once the cache exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir='video_cache', max_bytes=2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.object_dir = os.path.join(cache_dir, 'objects')
+        self.url_dir = os.path.join(cache_dir, 'urls')
+        self.lock_dir = os.path.join(cache_dir, 'locks')
+        self.tmp_dir = os.path.join(cache_dir, 'tmp')
+        for directory in (self.object_dir, self.url_dir, self.lock_dir, self.tmp_dir):
+            os.makedirs(directory, exist_ok=True)
+        self.index_lock = os.path.join(self.lock_dir, 'index.lock')
+
+    def object_path(self, content_hash):
+        return os.path.join(self.object_dir, content_hash + '.mp4')
+
+    def _record_path(self, url):
+        return os.path.join(self.url_dir, url_key(url) + '.json')
+
+    def lookup(self, url):
+        """Cached path for url, or None. A hit counts as a use for LRU eviction."""
+        try:
+            with open(self._record_path(url)) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        path = self.object_path(record['sha256'])
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None  # Evicted since the URL was fetched
+        return path
+
+    def fetch(self, url):
+        """Local path of the video at url, downloading it on a miss."""
+        with file_lock(os.path.join(self.lock_dir, url_key(url) + '.lock')):
+            path = self.lookup(url)
+            if path:
+                return path
+
+            work_dir = tempfile.mkdtemp(dir=self.tmp_dir)
+            try:
+                downloaded = self._download(url, work_dir)
+                content_hash = hash_file(downloaded)
+                path = self.object_path(content_hash)
+                with file_lock(self.index_lock):
+                    if os.path.exists(path):
+                        os.utime(path)  # Same video already cached under another URL
+                    else:
+                        os.replace(downloaded, path)
+                    self._write_record(url, content_hash, os.path.getsize(path))
+                    self._evict(keep=path)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+            return path
+
+    def _write_record(self, url, content_hash, size):
+        record_path = self._record_path(url)
+        temp_path = record_path + f'.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'url': url, 'sha256': content_hash, 'size': size,
+                       'fetched_at': time.time()}, f)
+        os.replace(temp_path, record_path)
+
+    def _download(self, url, work_dir):
+        """Download into work_dir and return the file path.
+
+        YouTube pages go through yt_dlp; other http(s) URLs are fetched
+        directly unless they turn out to be a web page rather than a file.
+        """
+        if not is_youtube(url) and urllib.parse.urlparse(url).scheme in ('http', 'https'):
+            path = os.path.join(work_dir, 'video')
+            with urllib.request.urlopen(url, timeout=30) as response:
+                if not response.headers.get_content_type().startswith('text/html'):
+                    with open(path, 'wb') as f:
+                        shutil.copyfileobj(response, f, CHUNK_SIZE)
+                    return path
+
+        # Only needed for page URLs, so it is not a hard dependency
+        import yt_dlp
+        options = {
+            'format': 'mp4',
+            'outtmpl': os.path.join(work_dir, 'video.%(ext)s'),
+            'quiet': True
+        }
+        with yt_dlp.YoutubeDL(options) as ydl:
+            ydl.download([url])
+        return os.path.join(work_dir, os.listdir(work_dir)[0])
+
+    def _evict(self, keep=None):
+        # Caller holds the index lock
+        entries = []
+        total = 0
+        for name in os.listdir(self.object_dir):
+            path = os.path.join(self.object_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue  # Still open elsewhere on Windows; try again next time
+            total -= size
+            print(f"Evicted {os.path.basename(path)} from video cache")
+
+    def prefetch(self, urls, workers=4):
+        """Fetch many URLs concurrently. Returns {url: path or None on error}."""
+        def fetch_one(url):
+            try:
+                return self.fetch(url)
+            except Exception as e:
+                print(f"Error downloading {url}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(urls, executor.map(fetch_one, urls)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefetch videos into the local video cache")
+    parser.add_argument('urls', nargs='+')
+    parser.add_argument('--cache-dir', default='video_cache')
+    parser.add_argument('--max-mb', type=int, default=2048)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    cache = VideoCache(args.cache_dir, max_bytes=args.max_mb * 1024 * 1024)
+    for url, path in cache.prefetch(args.urls, args.workers).items():
+        print(f"{url} -> {path or 'failed'}")
+
+
+if __name__ == "__main__":
+    main()
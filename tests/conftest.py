@@ -0,0 +1,38 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The modules in src/ import each other as top-level scripts
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def squat_landmarks(reps, frames_per_rep=30):
+    """Synthetic (33, 4) landmark frames of a side-on squat, standing between reps."""
+    frames = []
+    for i in range(reps * frames_per_rep + frames_per_rep // 2):
+        phase = (1 - np.cos(2 * np.pi * i / frames_per_rep)) / 2  # 0 standing, 1 bottom
+        landmarks = np.zeros((33, 4), dtype=np.float32)
+        landmarks[:, 3] = 1.0
+        landmarks[23] = [0.5, 0.4 + 0.15 * phase, 0, 1]  # left hip
+        landmarks[25] = [0.5 + 0.15 * phase, 0.6 + 0.05 * phase, 0, 1]  # left knee
+        landmarks[27] = [0.5, 0.85, 0, 1]  # left ankle
+        landmarks[28] = [0.6, 0.85, 0, 1]  # right ankle
+        frames.append(landmarks)
+    return frames
+
+
+@pytest.fixture
+def write_video(tmp_path):
+    """Write a small test video and return its path."""
+    import cv2
+
+    def write(frames=60, size=(64, 48), name='clip.mp4'):
+        path = str(tmp_path / name)
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 30, size)
+        for i in range(frames):
+            writer.write(np.full((size[1], size[0], 3), i % 256, dtype=np.uint8))
+        writer.release()
+        return path
+    return write
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from analyzers import AnalysisPipeline, CPRPoseAnalyzer, SquatAnalyzer
+from conftest import squat_landmarks
+from pose_backend import ReplayBackend
+
+
+class CountingBackend(ReplayBackend):
+    def __init__(self, landmarks):
+        super().__init__(landmarks, loop=False)
+        self.calls = 0
+
+    def process(self, frame):
+        self.calls += 1
+        return super().process(frame)
+
+
+def test_pipeline_runs_inference_once_per_frame_for_all_analyzers():
+    frames = squat_landmarks(reps=3)
+    for i, landmarks in enumerate(frames):
+        # Wrists pump at 2 Hz (every 15 frames at 30 fps), 20 units deep
+        phase = (1 - np.cos(2 * np.pi * i / 15)) / 2
+        landmarks[15, 1] = landmarks[16, 1] = 0.5 + 0.2 * phase
+    backend = CountingBackend(frames)
+    pipeline = AnalysisPipeline([SquatAnalyzer(), CPRPoseAnalyzer()], backend=backend)
+    image = np.zeros((48, 64, 3), np.uint8)
+
+    # Timestamps of a 30 fps video analyzed far faster than real time
+    for i in range(len(frames)):
+        output = pipeline.process(image, timestamp=i / 30.0, draw=False)
+
+    assert backend.calls == len(frames)
+    assert output['squat']['squat_count'] == 3
+    assert output['cpr']['compression_count'] == pytest.approx(len(frames) / 15, abs=1)
+    assert output['cpr']['rate'] == pytest.approx(120, rel=0.05)
+
+    pipeline.reset()
+    assert pipeline.analyzers['squat'].pose_detector.squat_count == 0
+    assert pipeline.analyzers['cpr'].cpr_analyzer.compression_count == 0
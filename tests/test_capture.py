@@ -0,0 +1,165 @@
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from capture import (CaptureSource, FileSource, ImageSequenceSource, StreamSource,
+                     open_capture)
+
+
+@pytest.fixture
+def image_dir(tmp_path):
+    for i in range(5):
+        cv2.imwrite(str(tmp_path / f"frame_{i:03d}.png"), np.full((24, 32, 3), i * 40, np.uint8))
+    (tmp_path / 'notes.txt').write_text('not an image')
+    return tmp_path
+
+
+class BufferedCamera:
+    """Stand-in for a camera whose driver already queued frames with monotonic timestamps."""
+
+    def __init__(self, frame_times):
+        self.frame_times = list(frame_times)
+        self.current = None
+
+    def isOpened(self):
+        return True
+
+    def read(self, image=None):
+        self.current = self.frame_times.pop(0)
+        return True, np.zeros((4, 4, 3), np.uint8)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return self.current * 1000.0
+        return 0
+
+    def release(self):
+        pass
+
+
+class LiveCamera(BufferedCamera):
+    """A 30 fps camera with some frames already queued; past those, grab() waits for the next."""
+
+    def __init__(self, frame_times):
+        super().__init__(frame_times)
+        self.grabs = 0
+
+    def grab(self):
+        self.grabs += 1
+        if not self.frame_times:
+            time.sleep(1 / 30)
+            self.frame_times.append(time.monotonic())
+        self.current = self.frame_times.pop(0)
+        return True
+
+    def retrieve(self, image=None):
+        return True, np.zeros((4, 4, 3), np.uint8)
+
+
+def test_image_sequence_reads_images_in_name_order(image_dir):
+    source = open_capture(str(image_dir))
+    assert isinstance(source, ImageSequenceSource)
+    assert source.get(cv2.CAP_PROP_FRAME_COUNT) == 5
+
+    values = []
+    frame = None
+    while True:
+        ret, frame = source.read(frame)
+        if not ret:
+            break
+        values.append(int(frame[0, 0, 0]))
+    assert values == [0, 40, 80, 120, 160]
+
+    # Seeking back works like VideoCapture and restarts playback timing
+    assert source.set(cv2.CAP_PROP_POS_FRAMES, 3)
+    ret, frame = source.read()
+    assert ret and frame[0, 0, 0] == 120
+    assert source.get(cv2.CAP_PROP_POS_MSEC) == pytest.approx(3 * 1000 / 30)
+
+
+def test_file_source_reads_every_frame(write_video):
+    path = write_video(frames=20)
+    source = open_capture(path)
+    assert isinstance(source, FileSource)
+    count = 0
+    while source.read()[0]:
+        count += 1
+    assert count == 20
+
+    stats = source.latency_stats()
+    assert stats['reads'] == 20
+    assert stats['clock'] == 'playback'
+    # Read far faster than real time, so no frame is late
+    assert stats['max_ms'] == pytest.approx(0, abs=50)
+    source.release()
+
+
+def test_options_that_do_not_apply_are_ignored(write_video, image_dir):
+    assert isinstance(open_capture(write_video(), fps=10, width=640), FileSource)
+    source = open_capture(str(image_dir), fps=10, grab_latest=False)
+    assert source.get(cv2.CAP_PROP_FPS) == 10
+
+
+def test_video_file_urls_are_not_live_streams(monkeypatch):
+    opened = []
+    monkeypatch.setattr(FileSource, '__init__', lambda self, path: opened.append(('file', path)))
+    monkeypatch.setattr(StreamSource, '__init__',
+                        lambda self, url, buffer_size=1, grab_latest=True: opened.append(('stream', url)))
+    open_capture('http://127.0.0.1:8000/squat.mp4', grab_latest=False)
+    open_capture('http://127.0.0.1:8000/live', grab_latest=False)
+    open_capture('rtsp://camera/stream')
+    assert [kind for kind, _ in opened] == ['file', 'stream', 'stream']
+
+
+def test_frame_age_counts_buffering_not_read_time():
+    # Four frames captured 0.5 s ago sit in the driver queue; reads return at once
+    now = time.monotonic()
+    source = CaptureSource(BufferedCamera([now - 0.5] * 4), 'buffered', clock='monotonic')
+    for _ in range(4):
+        assert source.read()[0]
+    stats = source.latency_stats()
+    assert stats['wait_mean_ms'] < 50
+    assert stats['mean_ms'] >= 500
+
+
+def test_relative_clock_measures_against_freshest_frame():
+    # Stream timestamps with an arbitrary origin; the last frame arrives 200 ms later than it should
+    camera = BufferedCamera([1000.0, 1000.0, 999.8])
+    source = CaptureSource(camera, 'stream', clock='relative')
+    for _ in range(3):
+        source.read()
+    ages = list(source.ages)
+    assert ages[0] == 0
+    assert ages[2] == pytest.approx(0.2, abs=0.05)
+
+
+def test_grab_latest_keeps_a_fresh_buffered_frame():
+    # One frame captured 1 ms ago is queued: take it rather than wait for the next
+    now = time.monotonic()
+    camera = LiveCamera([now - 0.001])
+    source = CaptureSource(camera, 'webcam', grab_latest=True, clock='monotonic')
+    assert source.read()[0]
+    assert camera.grabs == 1
+    assert source.discarded == 0
+    assert source.latency_stats()['wait_mean_ms'] < 1000 / 60
+
+
+def test_grab_latest_skips_stale_frames_by_driver_timestamp():
+    now = time.monotonic()
+    camera = LiveCamera([now - 0.3, now - 0.2, now - 0.005])
+    source = CaptureSource(camera, 'webcam', grab_latest=True, clock='monotonic')
+    assert source.read()[0]
+    assert source.discarded == 2
+    assert camera.current == now - 0.005
+
+
+def test_grab_latest_without_timestamps_skips_only_frames_that_can_be_stale():
+    # Loop took about three frame intervals: at most three frames can have arrived
+    camera = LiveCamera([0.0] * 6)
+    source = CaptureSource(camera, 'stream', grab_latest=True, clock='relative')
+    source.last_grab = time.monotonic() - 3.5 / 30
+    assert source.read()[0]
+    assert camera.grabs == 3
+    assert source.discarded == 2
@@ -0,0 +1,115 @@
+import functools
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from conftest import squat_landmarks
+from job_server import JobServer
+from pose_backend import PoseBackend, ReplayBackend
+
+
+class CrashingBackend(PoseBackend):
+    """Kills its worker process on the first frame, like a native crash."""
+
+    def process(self, frame):
+        os._exit(3)
+
+
+def broken_backend():
+    """Fails while the worker sets up, like a bad install."""
+    raise RuntimeError("backend unavailable")
+
+
+def request(server, path, data=None):
+    host, port = server.address
+    with urllib.request.urlopen(f"http://{host}:{port}{path}", data=data, timeout=10) as response:
+        return json.load(response)
+
+
+def wait_for(server, job_id, statuses=('done', 'failed'), timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = request(server, f"/jobs/{job_id}")
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.1)
+    pytest.fail(f"job {job_id} did not finish")
+
+
+@pytest.fixture
+def start_server(tmp_path):
+    servers = []
+
+    def start(**options):
+        server = JobServer(str(tmp_path / 'data'), port=0, **options)
+        server.start()
+        servers.append(server)
+        return server
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def test_counts_every_rep_and_caches_results(start_server, write_video):
+    frames = squat_landmarks(reps=12)
+    server = start_server(workers=1, backend_factory=functools.partial(ReplayBackend, frames))
+    with open(write_video(frames=len(frames)), 'rb') as f:
+        video = f.read()
+
+    job = request(server, '/jobs', video)
+    assert job['status'] == 'queued'
+    job = wait_for(server, job['id'])
+    assert job['status'] == 'done'
+    # Batch jobs are not limited by the live session's 10-rep cap
+    assert job['result']['squat_count'] == 12
+    assert job['result']['frames'] == len(frames)
+    assert len(job['result']['reps']) == 12
+
+    # Same bytes again: answered from the result cache without a worker
+    cached = request(server, '/jobs', video)
+    assert cached['status'] == 'done'
+    assert cached['result'] == job['result']
+    assert len(request(server, '/jobs')) == 2
+
+
+def test_crashed_worker_is_restarted_and_job_fails(start_server, write_video):
+    server = start_server(workers=1, backend_factory=CrashingBackend, max_retries=1)
+    with open(write_video(), 'rb') as f:
+        job = request(server, '/jobs', f.read())
+
+    job = wait_for(server, job['id'])
+    assert job['status'] == 'failed'
+    assert 'crashed' in job['error']
+
+    # The worker slot was freed and, after its restart delay, a replacement started
+    def replaced():
+        return all(worker is not None and worker.is_alive() for worker in server.workers)
+    deadline = time.time() + 10
+    while not replaced() and time.time() < deadline:
+        time.sleep(0.1)
+    assert replaced()
+    assert server.assigned == {}
+    assert server.healthy
+
+
+def test_worker_failing_at_startup_is_given_up(start_server, write_video):
+    server = start_server(workers=1, backend_factory=broken_backend,
+                          restart_delay=0.05, max_worker_failures=3)
+    with open(write_video(), 'rb') as f:
+        video = f.read()
+    job = request(server, '/jobs', video)
+
+    # Never handed to a worker that did not start, so it is not charged a crash
+    job = wait_for(server, job['id'])
+    assert job['status'] == 'failed'
+    assert job['error'] == 'no workers available'
+    assert server.failures == [3]
+    assert server.workers == [None]
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        request(server, '/jobs', video)
+    assert error.value.code == 503
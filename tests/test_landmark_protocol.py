@@ -0,0 +1,54 @@
+import pytest
+
+from conftest import squat_landmarks
+from landmark_protocol import LandmarkReceiver, encode_packet
+
+FRAME_SIZE = (640, 480)
+
+
+@pytest.fixture
+def receiver():
+    receiver = LandmarkReceiver('127.0.0.1', 0)
+    yield receiver
+    receiver.close()
+
+
+def send_reps(receiver, station_id, session, reps, first_sequence=0):
+    metrics = None
+    for i, landmarks in enumerate(squat_landmarks(reps)):
+        metrics = receiver.handle(encode_packet(station_id, session, first_sequence + i,
+                                                i / 30.0, FRAME_SIZE, landmarks))
+    return metrics
+
+
+def test_station_counts_past_the_live_cap(receiver):
+    assert send_reps(receiver, 1, session=7, reps=12)['squat_count'] == 12
+
+
+def test_restart_resets_the_station(receiver):
+    send_reps(receiver, 1, session=7, reps=3)
+
+    metrics = send_reps(receiver, 1, session=8, reps=2)
+
+    assert metrics['squat_count'] == 2
+    assert receiver.dropped == 0
+
+
+def test_straggler_from_retired_session_is_dropped(receiver):
+    send_reps(receiver, 1, session=7, reps=1)
+    send_reps(receiver, 1, session=8, reps=1)
+
+    late = encode_packet(1, 7, 10_000, 0.0, FRAME_SIZE)
+
+    assert receiver.handle(late) is None
+    assert receiver.dropped == 1
+    assert receiver.sessions[1] == 8
+
+
+def test_sequence_wraps_around(receiver):
+    for sequence in (0xFFFFFFFE, 0xFFFFFFFF, 0, 1):
+        assert receiver.handle(encode_packet(1, 7, sequence, 0.0, FRAME_SIZE)) is not None
+
+    assert receiver.handle(encode_packet(1, 7, 0xFFFFFFFF, 0.0, FRAME_SIZE)) is None
+    assert receiver.handle(encode_packet(1, 7, 1, 0.0, FRAME_SIZE)) is None
+    assert receiver.dropped == 2
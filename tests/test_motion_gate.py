@@ -0,0 +1,18 @@
+import numpy as np
+
+from motion_gate import MotionGate
+
+
+def test_uncommitted_frame_does_not_become_the_reference():
+    gate = MotionGate()
+    still = np.zeros((48, 64, 3), np.uint8)
+    moved = still + 50
+    assert gate.should_infer(still, 0.0)
+
+    # The worker dropped the moved frame, so the next one still counts as motion
+    assert gate.should_infer(moved, 0.1, commit=False)
+    assert gate.should_infer(moved, 0.2, commit=False)
+    gate.accept(0.2)
+
+    assert not gate.should_infer(moved, 0.3)
+    assert gate.last_inferred == 0.2
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from replay_buffer import ReplayBuffer
+
+
+def frame(value=0):
+    # Noise keeps every JPEG about the same, non-trivial size
+    rng = np.random.default_rng(value)
+    return rng.integers(0, 256, (48, 64, 3), dtype=np.uint8)
+
+
+def test_evicts_frames_older_than_max_seconds():
+    buffer = ReplayBuffer(max_seconds=2)
+    for i in range(10):
+        buffer.push(frame(i), {}, i * 0.5)
+
+    assert buffer.end_time == 4.5
+    assert buffer.start_time == 2.5
+    assert len(buffer.entries) == 5
+
+
+def test_evicts_oldest_frames_over_max_bytes():
+    buffer = ReplayBuffer(max_bytes=10 ** 9)
+    buffer.push(frame(0), {'landmarks': np.zeros((33, 4), np.float32)}, 0.0)
+    entry_size = buffer.total_bytes
+    buffer = ReplayBuffer(max_bytes=int(entry_size * 3.5))
+    for i in range(6):
+        buffer.push(frame(i), {'landmarks': np.zeros((33, 4), np.float32)}, i * 0.1)
+
+    assert buffer.total_bytes <= buffer.max_bytes
+    assert buffer.total_bytes == sum(entry['size'] for entry in buffer.entries)
+    assert [entry['timestamp'] for entry in buffer.entries] == pytest.approx([0.3, 0.4, 0.5])
+
+
+def test_entries_keep_metrics_without_frame():
+    buffer = ReplayBuffer()
+    buffer.push(frame(), {'frame': frame(), 'knee_angle': 120}, 0.0)
+
+    replayed, entry, wait = next(buffer.replay())
+    assert entry['metrics'] == {'knee_angle': 120}
+    assert replayed.shape == (48, 64, 3)
+    assert wait == 0
+
+
+def test_jump_points_after_video_loop():
+    history = [{'start_time': 1.0, 'end_time': 2.0}, {'start_time': 3.0, 'end_time': 4.0}]
+    buffer = ReplayBuffer()
+    # The video looped: timestamps restart, earlier reps stay in the history
+    buffer.clear(len(history))
+    for i in range(40):
+        buffer.push(frame(i), {}, i * 0.1)
+    history.append({'start_time': 1.5, 'end_time': 2.5})
+    # Started inside the buffer but has not ended by its last frame
+    history.append({'start_time': 3.0, 'end_time': 4.5})
+
+    assert buffer.rep_jump_points(history) == [(2, 1.5)]
+
+
+def test_jump_points_without_loop_use_every_buffered_rep():
+    history = [{'start_time': 0.5, 'end_time': 1.0}, {'start_time': 5.0, 'end_time': 6.0}]
+    buffer = ReplayBuffer()
+    for i in range(40):
+        buffer.push(frame(i), {}, i * 0.1)
+
+    assert buffer.rep_jump_points(history) == [(0, 0.5)]
@@ -0,0 +1,37 @@
+import json
+
+import numpy as np
+
+from conftest import squat_landmarks
+from landmark_trace import save_trace
+from threshold_sweep import replay, sweep, trace_features
+
+PARAMS = {'squat_entry_angle': 140, 'standing_angle': 160, 'depth_factor': 0.4, 'good_depth': 0}
+
+
+def squat_trace(reps):
+    landmarks = list(squat_landmarks(reps))
+    return {'landmarks': np.array(landmarks), 'timestamps': np.arange(len(landmarks)) / 30.0,
+            'frame_width': 640, 'frame_height': 480}
+
+
+def test_replay_counts_past_the_live_cap():
+    features = trace_features(squat_trace(12))
+
+    assert replay(features, PARAMS) == (12, 12)
+    assert replay(features, PARAMS, max_reps=10) == (10, 10)
+
+
+def test_sweep_scores_long_traces(tmp_path):
+    for name, reps in (('short', 5), ('long', 12)):
+        trace = squat_trace(reps)
+        save_trace(str(tmp_path / f"{name}.npz"), list(trace['landmarks']), trace['timestamps'],
+                   (trace['frame_width'], trace['frame_height']))
+    (tmp_path / 'labels.json').write_text(json.dumps({'short': 5, 'long': 12}))
+    grid = {'squat_entry_angle': [140], 'standing_angle': [160],
+            'depth_factor': [0.4], 'good_depth': [0]}
+
+    best = sweep(str(tmp_path), grid, workers=1)[0]
+
+    assert best['rep_error'] == 0
+    assert best['exact'] == 2
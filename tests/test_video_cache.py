@@ -0,0 +1,94 @@
+import functools
+import os
+import threading
+import time
+from collections import Counter
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from video_cache import VideoCache
+
+
+class CountingHandler(SimpleHTTPRequestHandler):
+    """Serves files from a directory, counting GETs and answering slowly
+    enough that concurrent fetches of one URL overlap."""
+
+    def do_GET(self):
+        self.server.requests[self.path] += 1
+        time.sleep(0.1)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server(tmp_path):
+    root = tmp_path / 'www'
+    root.mkdir()
+    for name, size in (('a.mp4', 4000), ('b.mp4', 4000), ('c.mp4', 4000)):
+        (root / name).write_bytes(name.encode() * (size // len(name)))
+    (root / 'copy_of_a.mp4').write_bytes((root / 'a.mp4').read_bytes())
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0),
+                                functools.partial(CountingHandler, directory=str(root)))
+    httpd.requests = Counter()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_prefetch_downloads_each_url_once(server, tmp_path):
+    cache = VideoCache(str(tmp_path / 'cache'))
+    urls = [f"{server.url}/a.mp4"] * 4 + [f"{server.url}/b.mp4"] * 4
+
+    paths = cache.prefetch(urls, workers=8)
+
+    assert server.requests == {'/a.mp4': 1, '/b.mp4': 1}
+    assert all(paths.values())
+    assert cache.lookup(f"{server.url}/a.mp4") == paths[f"{server.url}/a.mp4"]
+    assert os.listdir(cache.tmp_dir) == []
+
+
+def test_same_content_is_stored_once(server, tmp_path):
+    cache = VideoCache(str(tmp_path / 'cache'))
+
+    first = cache.fetch(f"{server.url}/a.mp4")
+    second = cache.fetch(f"{server.url}/copy_of_a.mp4")
+
+    assert first == second
+    assert len(os.listdir(cache.object_dir)) == 1
+
+
+def test_least_recently_used_video_is_evicted(server, tmp_path):
+    cache = VideoCache(str(tmp_path / 'cache'), max_bytes=9000)
+    a, b = f"{server.url}/a.mp4", f"{server.url}/b.mp4"
+    cache.fetch(a)
+    cache.fetch(b)
+    # a was fetched first; using it again leaves b least recently used
+    os.utime(cache.lookup(a), (1, 1))
+    os.utime(cache.lookup(b), (2, 2))
+    cache.lookup(a)
+
+    cache.fetch(f"{server.url}/c.mp4")
+
+    assert cache.lookup(b) is None
+    assert cache.lookup(a) is not None
+    assert len(os.listdir(cache.object_dir)) == 2
+
+    cache.fetch(b)
+    assert server.requests['/b.mp4'] == 2
+
+
+def test_failed_download_returns_none(server, tmp_path):
+    cache = VideoCache(str(tmp_path / 'cache'))
+
+    paths = cache.prefetch([f"{server.url}/missing.mp4"])
+
+    assert paths == {f"{server.url}/missing.mp4": None}
+    assert os.listdir(cache.object_dir) == []
+    assert os.listdir(cache.tmp_dir) == []